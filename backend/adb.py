@@ -0,0 +1,133 @@
+"""Асинхронный доступ к базе: функции db выполняются в выделенных пулах потоков.
+
+Чтение и запись разведены по разным пулам, поэтому всплеск записей не
+занимает потоки чтения, а цикл событий никогда не ждёт SQLite. Запись идёт
+через один поток — это и есть очередь писателя; ожидание в ней ограничено
+DB_WRITE_TIMEOUT, после чего поднимается DatabaseBusyError.
+"""
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import threading
+from typing import Any
+
+import db
+
+DB_READ_WORKERS = int(os.environ.get("DB_READ_WORKERS", str(max(db.DB_POOL_SIZE - 1, 1))))
+
+# Пулы создаются при первом обращении и заново после shutdown(): приложение
+# можно запускать и останавливать в одном процессе несколько раз.
+_read_executor: ThreadPoolExecutor | None = None
+_write_executor: ThreadPoolExecutor | None = None
+_executors_lock = threading.Lock()
+
+
+def _executors() -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    global _read_executor, _write_executor
+    with _executors_lock:
+        if _read_executor is None or _write_executor is None:
+            _read_executor = ThreadPoolExecutor(
+                max_workers=DB_READ_WORKERS, thread_name_prefix="db-read"
+            )
+            _write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        return _read_executor, _write_executor
+
+
+async def run_read(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executors()[0], functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_write(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    future = _executors()[1].submit(func, *args, **kwargs)
+    waiter = asyncio.wrap_future(future)
+    try:
+        return await asyncio.wait_for(asyncio.shield(waiter), db.DB_WRITE_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Не дождались очереди — запись отменяется и не выполнится вовсе.
+        if future.cancel():
+            raise db.DatabaseBusyError("write_timeout")
+        return await waiter
+
+
+async def iterate_read(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Проходит генератор db по шагам в пуле чтения.
+
+    Генератор закрывается (и освобождает своё соединение) в пуле чтения,
+    даже если клиент ушёл посреди выгрузки.
+    """
+    sentinel = object()
+    future = None
+    executor = _executors()[0]
+    try:
+        while True:
+            future = executor.submit(next, iterator, sentinel)
+            item = await asyncio.wrap_future(future)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        if future is None or future.done():
+            executor.submit(iterator.close)
+        else:
+            # Шаг ещё выполняется в потоке — закрываем после него.
+            future.add_done_callback(lambda _: executor.submit(iterator.close))
+
+
+def _reader(func: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_read(func, *args, **kwargs)
+
+    return wrapper
+
+
+def _writer(func: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_write(func, *args, **kwargs)
+
+    return wrapper
+
+
+def shutdown() -> None:
+    """Дожидается запущенных вызовов и освобождает потоки пулов."""
+    global _read_executor, _write_executor
+    with _executors_lock:
+        executors = (_read_executor, _write_executor)
+        _read_executor = _write_executor = None
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+init_db = _writer(db.init_db)
+create_registration = _writer(db.create_registration)
+import_registrations = _writer(db.import_registrations)
+has_played_game = _reader(db.has_played_game)
+get_played_games = _reader(db.get_played_games)
+create_game_result = _writer(db.create_game_result)
+create_game_results_batch = _writer(db.create_game_results_batch)
+get_teams = _reader(db.get_teams)
+upsert_team = _writer(db.upsert_team)
+update_team = _writer(db.update_team)
+delete_team = _writer(db.delete_team)
+get_stats = _reader(db.get_stats)
+get_player_rank_window = _reader(db.get_player_rank_window)
+get_team_stats = _reader(db.get_team_stats)
+get_team_total_standings = _reader(db.get_team_total_standings)
+reset_all_game_results = _writer(db.reset_all_game_results)
+list_truth_or_myth_questions = _reader(db.list_truth_or_myth_questions)
+create_truth_or_myth_question = _writer(db.create_truth_or_myth_question)
+update_truth_or_myth_question = _writer(db.update_truth_or_myth_question)
+delete_truth_or_myth_question = _writer(db.delete_truth_or_myth_question)
+import_truth_or_myth_questions = _writer(db.import_truth_or_myth_questions)
+list_true_false_questions = _reader(db.list_true_false_questions)
+get_true_false_question = _reader(db.get_true_false_question)
+create_true_false_question = _writer(db.create_true_false_question)
+update_true_false_question = _writer(db.update_true_false_question)
+delete_true_false_question = _writer(db.delete_true_false_question)
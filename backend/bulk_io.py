@@ -0,0 +1,165 @@
+"""Потоковый разбор и формирование CSV/JSON для массовых импорта и выгрузки."""
+import codecs
+from collections.abc import AsyncIterator, Iterable, Sequence
+import csv
+import io
+import json
+from typing import Any
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = ""
+    async for text in _iter_text(chunks):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict[str, str]]:
+    """Строки CSV (первая — заголовок) в виде словарей по мере поступления байтов.
+
+    Перевод строки внутри поля в кавычках поддерживается: текст копится,
+    пока кавычки не закроются.
+    """
+    header: list[str] | None = None
+    record_text = ""
+    async for line in _iter_lines(chunks):
+        record_text += line
+        if record_text.count('"') % 2:
+            continue
+        try:
+            rows = list(csv.reader(io.StringIO(record_text), strict=True))
+        except csv.Error:
+            raise ValueError("bad_csv")
+        record_text = ""
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            if header is None:
+                header = [cell.strip() for cell in row]
+                continue
+            yield dict(zip(header, row))
+    if record_text.strip():
+        raise ValueError("bad_csv")
+
+
+# Символы, которыми может продолжаться число JSON.
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Элементы JSON-массива верхнего уровня по одному, не дожидаясь конца тела.
+
+    Между элементами — ровно одна запятая; лишняя, начальная или висячая
+    запятая, как и любой другой разрыв синтаксиса, — ValueError("bad_json").
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    finished = False
+    # Ждём элемент (после "[" или ","), иначе — "," или "]".
+    expect_item = True
+    items = 0
+    texts = _iter_text(chunks)
+    exhausted = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if buffer[0] != "[":
+                raise ValueError("bad_json")
+            started = True
+            buffer = buffer[1:].lstrip()
+        if started and buffer:
+            if not expect_item:
+                if buffer[0] == ",":
+                    expect_item = True
+                    buffer = buffer[1:]
+                    continue
+                if buffer[0] == "]":
+                    finished = True
+                    buffer = buffer[1:]
+                    break
+                raise ValueError("bad_json")
+            if buffer[0] == "]" and items == 0:
+                finished = True
+                buffer = buffer[1:]
+                break
+            if buffer[0] in ",]":
+                raise ValueError("bad_json")
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise ValueError("bad_json")
+            else:
+                # Число на границе куска могло прийти не полностью: "22" из "22.5".
+                if exhausted or (end < len(buffer) and buffer[end] not in _NUMBER_CHARS):
+                    buffer = buffer[end:]
+                    expect_item = False
+                    items += 1
+                    yield item
+                    continue
+        if exhausted:
+            break
+        try:
+            buffer += await texts.__anext__()
+        except StopAsyncIteration:
+            exhausted = True
+
+    if not finished or buffer.strip():
+        raise ValueError("bad_json")
+    async for text in texts:
+        if text.strip():
+            raise ValueError("bad_json")
+
+
+async def encode_csv(
+    batches: AsyncIterator[Iterable[Any]], fields: Sequence[str]
+) -> AsyncIterator[bytes]:
+    """CSV с заголовком `fields`; строки — sqlite3.Row или словари."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM — чтобы Excel открыл кириллицу в UTF-8 без настройки импорта.
+    buffer.write("\ufeff")
+    writer.writerow(fields)
+    async for rows in batches:
+        writer.writerows([row[field] for field in fields] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def encode_ndjson(batches: AsyncIterator[Iterable[Any]]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(dict(row), ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+
+async def encode_json_array(batches: AsyncIterator[Iterable[Any]]) -> AsyncIterator[bytes]:
+    separator = "[\n"
+    async for rows in batches:
+        parts = []
+        for row in rows:
+            parts.append(separator + json.dumps(dict(row), ensure_ascii=False))
+            separator = ",\n"
+        if parts:
+            yield "".join(parts).encode()
+    yield ("[]\n" if separator == "[\n" else "\n]\n").encode()
@@ -0,0 +1,56 @@
+"""Кэш готовых JSON-ответов в памяти процесса."""
+from collections.abc import Hashable
+import threading
+import time
+from typing import Any
+
+
+class ResponseCache:
+    """Хранит сериализованные тела ответов по ключу с ограниченным сроком жизни.
+
+    Значением может быть и набор данных, из которого ответ собирается
+    на каждый запрос (например, рейтинги экрана победы с индексом мест).
+
+    Сбрасывается целиком через `clear()` при изменении данных. Ответ, который
+    начали строить до сброса, в кэш уже не попадёт.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Hashable) -> tuple[Any | None, int]:
+        """Возвращает (тело или None, поколение) — поколение передаётся в `store()`."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1], self._generation
+            self.misses += 1
+            return None, self._generation
+
+    def store(self, key: Hashable, body: Any, generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self._ttl, body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "ttl_seconds": self._ttl,
+            }
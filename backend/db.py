@@ -1,97 +1,573 @@
+from contextlib import contextmanager
+import functools
+import inspect
 from pathlib import Path
+from typing import Any, Callable, Iterator
 from uuid import uuid4
 import json
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+
+from media_index import MediaIndex
+import metrics
+import schema
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).resolve().parent / "app.db"
 QUESTIONS_PATH = Path(__file__).resolve().parent / "truth_or_myth_questions.json"
 MEDIA_DIR = Path(__file__).resolve().parent / "media"
 TEAM_VIDEO_BASENAME = "congrats"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_WRITE_TIMEOUT = float(os.environ.get("DB_WRITE_TIMEOUT", "5"))
+
+# Настройки хранилища: применяются к каждому новому соединению.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-16000")),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+}
+
+
+class DatabaseBusyError(Exception):
+    """База не успела выдать соединение за отведённое время."""
+
+
 def get_connection() -> sqlite3.Connection:
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    metrics.DB_CONNECTIONS_OPENED.inc()
     conn.row_factory = sqlite3.Row
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value};")
     return conn
 
 
-def init_db() -> None:
+class ConnectionPool:
+    """Пул долгоживущих соединений: выдача (checkout) и возврат (return).
+
+    Одновременно выдаётся не больше `size` соединений, остальные вызовы ждут
+    до `timeout` секунд. Перед выдачей простаивавшее соединение проверяется
+    запросом `SELECT 1`, сломанное закрывается и заменяется новым.
+    """
+
+    def __init__(self, size: int, timeout: float) -> None:
+        self._timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+
+    def acquire(self) -> sqlite3.Connection:
+        if not self._slots.acquire(timeout=self._timeout):
+            raise DatabaseBusyError("pool_timeout")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return get_connection()
+                if _is_healthy(conn):
+                    return conn
+                _close_quietly(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            _close_quietly(conn)
+        else:
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Закрывает простаивающие соединения (вызывается при остановке приложения)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(conn)
+
+
+def _is_healthy(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("SELECT 1;").fetchone()
+    except sqlite3.Error:
+        return False
+    return True
+
+
+def _close_quietly(conn: sqlite3.Connection) -> None:
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+_pool = ConnectionPool(DB_POOL_SIZE, DB_POOL_TIMEOUT)
+
+
+@contextmanager
+def _connection() -> Iterator[sqlite3.Connection]:
+    conn = _pool.acquire()
+    metrics.DB_CONNECTIONS_IN_USE.inc()
+    try:
+        yield conn
+    finally:
+        metrics.DB_CONNECTIONS_IN_USE.dec()
+        _pool.release(conn)
+
+
+@contextmanager
+def _read_snapshot() -> Iterator[sqlite3.Connection]:
+    """Соединение с открытой транзакцией чтения: все запросы видят один снимок."""
+    with _connection() as conn:
+        conn.execute("BEGIN;")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+@contextmanager
+def _export_connection() -> Iterator[sqlite3.Connection]:
+    """Собственное соединение вне пула для выгрузок.
+
+    Выгрузка держит соединение, пока клиент её скачивает; медленные клиенты
+    не должны забирать соединения у обычных запросов.
+    """
     conn = get_connection()
     try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS registrations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fio TEXT NOT NULL,
-                team TEXT NOT NULL,
-                created_at TEXT NOT NULL DEFAULT (datetime('now'))
-            );
+        yield conn
+    finally:
+        _close_quietly(conn)
+
+
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def _write_connection() -> Iterator[sqlite3.Connection]:
+    """Соединение для записи: писатель всегда один, остальные ждут в очереди.
+
+    Ожидание ограничено DB_WRITE_TIMEOUT, после чего поднимается
+    DatabaseBusyError, а не `database is locked` из глубины SQLite.
+    """
+    if not _write_lock.acquire(timeout=DB_WRITE_TIMEOUT):
+        raise DatabaseBusyError("write_timeout")
+    try:
+        with _connection() as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            yield conn
+    finally:
+        _write_lock.release()
+
+
+def close_pool() -> None:
+    _pool.close()
+
+
+def _row_count(result: Any) -> int:
+    if isinstance(result, list):
+        return len(result)
+    return 1 if isinstance(result, sqlite3.Row) else 0
+
+
+def _timed(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Пишет длительность вызова и число строк в метрики db_query_*."""
+    name = func.__name__
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def iterate(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            # Считается только время внутри генератора, без пауз потребителя.
+            iterator = func(*args, **kwargs)
+            elapsed = 0.0
+            rows = 0
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        batch = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - started
+                    rows += len(batch)
+                    yield batch
+            finally:
+                iterator.close()
+                metrics.DB_QUERY_DURATION.observe(elapsed, name)
+                metrics.DB_QUERY_ROWS.inc(name, amount=rows)
+
+        return iterate
+
+    @functools.wraps(func)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            metrics.DB_QUERY_DURATION.observe(time.perf_counter() - started, name)
+            metrics.DB_QUERY_ROWS.inc(name, amount=_row_count(result))
+
+    return call
+
+
+_schema_version: int | None = None
+_change_epoch: str | None = None
+
+_change_listeners: list[Callable[[frozenset[str]], None]] = []
+_remote_change_listeners: list[Callable[[frozenset[str]], None]] = []
+# Счётчики изменений по таблицам в том виде, в каком их видел этот процесс.
+# Источник — таблица change_versions, общая для всех воркеров.
+_table_versions: dict[str, int] = {}
+_versions_lock = threading.Lock()
+_poller: threading.Thread | None = None
+_poller_stop = threading.Event()
+
+
+def add_change_listener(callback: Callable[[frozenset[str]], None]) -> None:
+    """Подписка на изменения: callback получает имена таблиц после коммита.
+
+    Изменения из других процессов приходят с задержкой до периода сверки
+    (см. `start_change_poller`).
+    """
+    _change_listeners.append(callback)
+
+
+def add_remote_change_listener(callback: Callable[[frozenset[str]], None]) -> None:
+    """Подписка только на изменения, сделанные другими процессами."""
+    _remote_change_listeners.append(callback)
+
+
+def table_versions(*tables: str) -> tuple[int, ...]:
+    with _versions_lock:
+        return tuple(_table_versions.get(table, 0) for table in tables)
+
+
+def change_epoch() -> str | None:
+    """Метка базы для ETag: счётчики изменений сравнимы только в пределах одной базы."""
+    return _change_epoch
+
+
+@_timed
+def mark_changed(*tables: str) -> None:
+    """Отмечает изменение ресурса вне базы (например, файлов в media)."""
+    with _write_connection() as conn:
+        _commit(conn, *tables)
+
+
+def _bump_versions(conn: sqlite3.Connection, tables: frozenset[str]) -> dict[str, int]:
+    versions = {}
+    for table in tables:
+        row = conn.execute(
             """
+            INSERT INTO change_versions (name, version) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET version = version + 1
+            RETURNING version;
+            """,
+            (table,),
+        ).fetchone()
+        versions[table] = int(row[0])
+    return versions
+
+
+def _commit(conn: sqlite3.Connection, *tables: str) -> None:
+    """Коммит изменяющей функции: счётчики `tables` растут в той же транзакции."""
+    changed = frozenset(tables)
+    versions = _bump_versions(conn, changed)
+    conn.commit()
+    if changed:
+        _notify_change(versions)
+
+
+def _notify_change(versions: dict[str, int], remote: bool = False) -> None:
+    changed = frozenset(versions)
+    # Сначала сброс кэшей, потом новые счётчики: запрос с новым ETag уже
+    # не застанет в кэше тело, построенное до изменения.
+    for callback in _change_listeners:
+        callback(changed)
+    if remote:
+        for callback in _remote_change_listeners:
+            callback(changed)
+    with _versions_lock:
+        for table, version in versions.items():
+            _table_versions[table] = max(_table_versions.get(table, 0), version)
+
+
+def _read_versions(conn: sqlite3.Connection) -> dict[str, int]:
+    cursor = conn.execute("SELECT name, version FROM change_versions;")
+    return {row["name"]: int(row["version"]) for row in cursor}
+
+
+def sync_changes(conn: sqlite3.Connection) -> frozenset[str]:
+    """Сверяет счётчики с базой и оповещает о чужих изменениях; возвращает их таблицы."""
+    versions = _read_versions(conn)
+    with _versions_lock:
+        newer = {
+            table: version
+            for table, version in versions.items()
+            if version > _table_versions.get(table, 0)
+        }
+    if newer:
+        _notify_change(newer, remote=True)
+    return frozenset(newer)
+
+
+def start_change_poller(interval: float) -> None:
+    """Фоновая сверка с изменениями других воркеров раз в `interval` секунд.
+
+    Пока другие соединения ничего не коммитили, `PRAGMA data_version` не
+    меняется и таблица счётчиков не читается.
+    """
+    global _poller
+    if interval <= 0 or _poller is not None:
+        return
+    _poller_stop.clear()
+
+    def poll() -> None:
+        conn = get_connection()
+        try:
+            seen = None
+            while not _poller_stop.wait(interval):
+                try:
+                    data_version = conn.execute("PRAGMA data_version;").fetchone()[0]
+                    if data_version != seen:
+                        seen = data_version
+                        sync_changes(conn)
+                except Exception:
+                    logger.exception("Не удалось сверить счётчики изменений")
+        finally:
+            conn.close()
+
+    _poller = threading.Thread(target=poll, name="change-poller", daemon=True)
+    _poller.start()
+
+
+def stop_change_poller() -> None:
+    global _poller
+    _poller_stop.set()
+    if _poller is not None:
+        _poller.join()
+        _poller = None
+
+
+@_timed
+def init_db(
+    team_videos: Callable[[], dict[str, str | None]] | None = None,
+    media_stamp: str | None = None,
+) -> bool:
+    """Применяет миграции схемы и заполняет справочники.
+
+    Пересчёт рейтингов и заполнение teams по каталогам media пропускаются,
+    если миграций не было, а `media_stamp` совпадает с сохранённым при
+    прошлом запуске. `team_videos` вызывается только для заполнения teams
+    и возвращает каталоги команд и их видео (см. MediaIndex); если не
+    передан, media сканируется здесь же. Возвращает True, если пересчёт
+    выполнялся.
+    """
+    global _schema_version, _change_epoch
+    with _write_connection() as conn:
+        applied = schema.current_version(conn)
+        version = schema.migrate(conn)
+        schema.ensure_indexes(conn)
+        full = (
+            media_stamp is None
+            or applied != version
+            or _startup_value(conn, "media_stamp") != media_stamp
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS game_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                registration_id INTEGER NOT NULL,
-                moves INTEGER NOT NULL,
-                created_at TEXT NOT NULL DEFAULT (datetime('now'))
-            );
-            """
+        if full:
+            _rebuild_leaderboards(conn)
+        _seed_truth_or_myth_questions(conn)
+        if full:
+            _seed_teams(conn, team_videos() if team_videos else _scan_team_videos())
+            if media_stamp is not None:
+                _set_startup_value(conn, "media_stamp", media_stamp)
+            # Уже запущенные воркеры сбросят кэши пересчитанных данных.
+            _bump_versions(conn, frozenset({"game_results", "teams", "media"}))
+        epoch = _startup_value(conn, "change_epoch")
+        if epoch is None:
+            epoch = uuid4().hex
+            _set_startup_value(conn, "change_epoch", epoch)
+        conn.commit()
+        versions = _read_versions(conn)
+    with _versions_lock:
+        _table_versions.update(versions)
+    _schema_version = version
+    _change_epoch = epoch
+    return full
+
+
+def _scan_team_videos() -> dict[str, str | None]:
+    media = MediaIndex(MEDIA_DIR, TEAM_VIDEO_BASENAME)
+    media.rebuild()
+    return media.team_videos()
+
+
+def _startup_value(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM startup_state WHERE key = ?;", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def _set_startup_value(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO startup_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+        """,
+        (key, value),
+    )
+
+
+def schema_version() -> int | None:
+    """Версия схемы после init_db (None — база ещё не инициализирована)."""
+    return _schema_version
+
+
+_TEAM_TOTALS_SELECT = """
+    SELECT
+        team,
+        COUNT(*) AS games_played,
+        SUM(best_moves) AS total_score,
+        MAX(CASE WHEN game_type = 'memo' THEN best_moves END) AS memo_best,
+        MAX(CASE WHEN game_type = 'truth_or_myth' THEN best_moves END) AS truth_or_myth_best,
+        MAX(CASE WHEN game_type = 'reaction' THEN best_moves END) AS reaction_best
+    FROM team_game_stats
+"""
+
+
+def _rebuild_team_leaderboards(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM team_game_stats;")
+    conn.execute("DELETE FROM team_total_stats;")
+    conn.execute(
+        """
+        INSERT INTO team_game_stats (team, game_type, games_count, best_moves, last_played)
+        SELECT r.team, p.game_type, SUM(p.games_count), MIN(p.best_moves), MAX(p.last_played)
+        FROM player_game_stats p
+        JOIN registrations r ON r.id = p.registration_id
+        GROUP BY r.team, p.game_type;
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO team_total_stats (
+            team, games_played, total_score, memo_best, truth_or_myth_best, reaction_best
         )
-        _ensure_game_results_game_type(conn)
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS teams (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                team TEXT NOT NULL UNIQUE,
-                media_path TEXT NOT NULL DEFAULT '',
-                sort_order INTEGER NOT NULL DEFAULT 0
-            );
-            """
+        {_TEAM_TOTALS_SELECT}
+        GROUP BY team;
+        """
+    )
+
+
+def _rebuild_leaderboards(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM player_game_stats;")
+    conn.execute(
+        """
+        INSERT INTO player_game_stats (registration_id, game_type, games_count, best_moves, last_played)
+        SELECT gr.registration_id, gr.game_type, COUNT(gr.id), MIN(gr.moves), MAX(gr.created_at)
+        FROM game_results gr
+        JOIN registrations r ON r.id = gr.registration_id
+        GROUP BY gr.registration_id, gr.game_type;
+        """
+    )
+    conn.execute("DELETE FROM game_player_counts;")
+    conn.execute(
+        """
+        INSERT INTO game_player_counts (game_type, players)
+        SELECT game_type, COUNT(*) FROM player_game_stats GROUP BY game_type;
+        """
+    )
+    _rebuild_team_leaderboards(conn)
+
+
+def _apply_results_to_leaderboards(conn: sqlite3.Connection, result_ids: list[int]) -> None:
+    params = [(result_id,) for result_id in result_ids]
+    # До вставки в player_game_stats: счётчик растёт только на новые строки рейтинга.
+    conn.executemany(
+        """
+        INSERT INTO game_player_counts (game_type, players)
+        SELECT gr.game_type, 1
+        FROM game_results gr
+        JOIN registrations r ON r.id = gr.registration_id
+        WHERE gr.id = ? AND NOT EXISTS (
+            SELECT 1 FROM player_game_stats p
+            WHERE p.registration_id = gr.registration_id AND p.game_type = gr.game_type
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS truth_or_myth_questions (
-                id TEXT PRIMARY KEY,
-                statement TEXT NOT NULL,
-                is_true INTEGER NOT NULL
-            );
-            """
+        ON CONFLICT(game_type) DO UPDATE SET players = players + 1;
+        """,
+        params,
+    )
+    conn.executemany(
+        """
+        INSERT INTO player_game_stats (registration_id, game_type, games_count, best_moves, last_played)
+        SELECT gr.registration_id, gr.game_type, 1, gr.moves, gr.created_at
+        FROM game_results gr
+        JOIN registrations r ON r.id = gr.registration_id
+        WHERE gr.id = ?
+        ON CONFLICT(registration_id, game_type) DO UPDATE SET
+            games_count = games_count + 1,
+            best_moves = MIN(best_moves, excluded.best_moves),
+            last_played = MAX(last_played, excluded.last_played);
+        """,
+        params,
+    )
+    conn.executemany(
+        """
+        INSERT INTO team_game_stats (team, game_type, games_count, best_moves, last_played)
+        SELECT r.team, gr.game_type, 1, gr.moves, gr.created_at
+        FROM game_results gr
+        JOIN registrations r ON r.id = gr.registration_id
+        WHERE gr.id = ?
+        ON CONFLICT(team, game_type) DO UPDATE SET
+            games_count = games_count + 1,
+            best_moves = MIN(best_moves, excluded.best_moves),
+            last_played = MAX(last_played, excluded.last_played);
+        """,
+        params,
+    )
+    conn.executemany(
+        f"""
+        INSERT INTO team_total_stats (
+            team, games_played, total_score, memo_best, truth_or_myth_best, reaction_best
         )
-        _ensure_truth_or_myth_active_column(conn)
-        _seed_truth_or_myth_questions(conn)
-        _seed_teams(conn)
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS true_false_questions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question TEXT NOT NULL,
-                answer INTEGER NOT NULL,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                created_at TEXT NOT NULL DEFAULT (datetime('now')),
-                updated_at TEXT NOT NULL DEFAULT (datetime('now'))
-            );
-            """
+        {_TEAM_TOTALS_SELECT}
+        WHERE team = (
+            SELECT r.team
+            FROM game_results gr
+            JOIN registrations r ON r.id = gr.registration_id
+            WHERE gr.id = ?
         )
-        conn.commit()
-    finally:
-        conn.close()
+        GROUP BY team
+        ON CONFLICT(team) DO UPDATE SET
+            games_played = excluded.games_played,
+            total_score = excluded.total_score,
+            memo_best = excluded.memo_best,
+            truth_or_myth_best = excluded.truth_or_myth_best,
+            reaction_best = excluded.reaction_best;
+        """,
+        params,
+    )
 
 
-def _seed_teams(conn: sqlite3.Connection) -> None:
-    if not MEDIA_DIR.exists():
-        return
+def _seed_teams(conn: sqlite3.Connection, team_videos: dict[str, str | None]) -> None:
+    team_names = sorted(team_videos, key=str.lower)
 
-    team_dirs = [item for item in MEDIA_DIR.iterdir() if item.is_dir()]
-    team_dirs.sort(key=lambda path: path.name.lower())
-
-    for sort_order, team_dir in enumerate(team_dirs, start=1):
-        candidates = sorted(team_dir.glob(f"{TEAM_VIDEO_BASENAME}.*"))
-        media_path = ""
-        for candidate in candidates:
-            if candidate.is_file():
-                media_path = f"{team_dir.name}/{candidate.name}"
-                break
-        if not media_path:
-            media_path = f"{team_dir.name}/{TEAM_VIDEO_BASENAME}.mp4"
+    for sort_order, team in enumerate(team_names, start=1):
+        filename = team_videos[team] or f"{TEAM_VIDEO_BASENAME}.mp4"
+        media_path = f"{team}/{filename}"
         conn.execute(
             """
             INSERT INTO teams (team, media_path, sort_order)
@@ -100,7 +576,7 @@ def _seed_teams(conn: sqlite3.Connection) -> None:
                 media_path = excluded.media_path,
                 sort_order = excluded.sort_order;
             """,
-            (team_dir.name, media_path, sort_order),
+            (team, media_path, sort_order),
         )
 
 
@@ -128,117 +604,197 @@ def _seed_truth_or_myth_questions(conn: sqlite3.Connection) -> None:
     )
 
 
-def _truth_or_myth_has_is_active(conn: sqlite3.Connection) -> bool:
-    cursor = conn.execute("PRAGMA table_info(truth_or_myth_questions);")
-    return any(row["name"] == "is_active" for row in cursor.fetchall())
-
+_INSERT_REGISTRATION = "INSERT INTO registrations (fio, email, team) VALUES (?, ?, ?);"
 
-def _ensure_truth_or_myth_active_column(conn: sqlite3.Connection) -> None:
-    if _truth_or_myth_has_is_active(conn):
-        return
-    conn.execute(
-        """
-        ALTER TABLE truth_or_myth_questions
-        ADD COLUMN is_active INTEGER NOT NULL DEFAULT 1;
-        """
-    )
-
-def _game_results_has_game_type(conn: sqlite3.Connection) -> bool:
-    cursor = conn.execute("PRAGMA table_info(game_results);")
-    return any(row["name"] == "game_type" for row in cursor.fetchall())
-
-
-def _ensure_game_results_game_type(conn: sqlite3.Connection) -> None:
-    if _game_results_has_game_type(conn):
-        return
-    conn.execute(
-        """
-        ALTER TABLE game_results ADD COLUMN game_type TEXT NOT NULL DEFAULT 'memo';
-        """
-    )
-    # Keep one result per registration (earliest) before unique index
-    conn.execute(
-        """
-        DELETE FROM game_results
-        WHERE id NOT IN (
-            SELECT MIN(id) FROM game_results GROUP BY registration_id
-        );
-        """
-    )
-    conn.execute(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS ix_game_results_reg_game
-        ON game_results(registration_id, game_type);
-        """
-    )
 
+@_timed
+def create_registration(fio: str, team: str, email: str | None = None) -> int:
+    with _write_connection() as conn:
+        cursor = conn.execute(_INSERT_REGISTRATION, (fio, email or "", team))
+        _commit(conn, "registrations")
+        return int(cursor.lastrowid)
 
-def _registration_has_email(conn: sqlite3.Connection) -> bool:
-    cursor = conn.execute("PRAGMA table_info(registrations);")
-    return any(row["name"] == "email" for row in cursor.fetchall())
 
+@_timed
+def import_registrations(
+    rows: list[tuple[str, str, str | None]],
+) -> tuple[list[int], list[str]]:
+    """Массовая регистрация (fio, team, email) одной транзакцией.
 
-def create_registration(fio: str, team: str, email: str | None = None) -> int:
-    conn = get_connection()
-    try:
-        if _registration_has_email(conn):
-            cursor = conn.execute(
-                "INSERT INTO registrations (fio, email, team) VALUES (?, ?, ?)",
-                (fio, email or "", team),
+    Команды, которых ещё нет в teams, создаются по правилам upsert_team (в
+    конец списка, с видео по умолчанию); существующие не меняются.
+    Возвращает id регистраций в порядке строк и список созданных команд.
+    """
+    with _write_connection() as conn:
+        known = {row["team"] for row in conn.execute("SELECT team FROM teams;")}
+        new_teams = list(dict.fromkeys(team for _, team, _ in rows if team not in known))
+        if new_teams:
+            max_order = conn.execute(
+                "SELECT COALESCE(MAX(sort_order), 0) FROM teams;"
+            ).fetchone()[0]
+            conn.executemany(
+                """
+                INSERT INTO teams (team, media_path, sort_order)
+                VALUES (?, ?, ?)
+                ON CONFLICT(team) DO NOTHING;
+                """,
+                [
+                    (team, f"{team}/{TEAM_VIDEO_BASENAME}.mp4", max_order + position)
+                    for position, team in enumerate(new_teams, start=1)
+                ],
             )
-        else:
-            cursor = conn.execute(
-                "INSERT INTO registrations (fio, team) VALUES (?, ?)",
-                (fio, team),
+
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM registrations;").fetchone()[0]
+        conn.executemany(
+            _INSERT_REGISTRATION,
+            ((fio, email or "", team) for fio, team, email in rows),
+        )
+        # Запись идёт под блокировкой писателя: всё, что новее last_id, вставили мы.
+        ids = [
+            int(row[0])
+            for row in conn.execute(
+                "SELECT id FROM registrations WHERE id > ? ORDER BY id;", (last_id,)
             )
-        conn.commit()
-        return int(cursor.lastrowid)
-    finally:
-        conn.close()
+        ]
+        _commit(conn, "registrations", *(["teams"] if new_teams else []))
+        return ids, new_teams
 
 
+@_timed
 def has_played_game(registration_id: int, game_type: str) -> bool:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         cursor = conn.execute(
             "SELECT 1 FROM game_results WHERE registration_id = ? AND game_type = ?",
             (registration_id, game_type),
         )
         return cursor.fetchone() is not None
-    finally:
-        conn.close()
 
 
+@_timed
 def get_played_games(registration_id: int) -> list[str]:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         cursor = conn.execute(
             "SELECT game_type FROM game_results WHERE registration_id = ?",
             (registration_id,),
         )
         return [row["game_type"] for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
-def create_game_result(registration_id: int, moves: int, game_type: str = "memo") -> int:
-    conn = get_connection()
-    try:
-        if has_played_game(registration_id, game_type):
+@_timed
+def create_game_result(registration_id: int, moves: int, game_type: str = "memo") -> dict:
+    """Записывает результат и возвращает его место в рейтингах.
+
+    Словарь: id, total_players по `game_type` и, если участник
+    зарегистрирован, rank, percentile (доля игроков с тем же или худшим
+    местом, в процентах) и team_position в командном зачёте. Всё
+    считается в той же транзакции: total_players — из счётчика
+    game_player_counts, место — подсчётом лучших строк по индексу рейтинга.
+    """
+    with _write_connection() as conn:
+        # Уникальный индекс (registration_id, game_type) решает за один запрос.
+        inserted = conn.execute(
+            """
+            INSERT INTO game_results (registration_id, game_type, moves)
+            VALUES (?, ?, ?)
+            ON CONFLICT(registration_id, game_type) DO NOTHING
+            RETURNING id;
+            """,
+            (registration_id, game_type, moves),
+        ).fetchall()
+        if not inserted:
             raise ValueError("already_played")
+        result_id = int(inserted[0]["id"])
+        _apply_results_to_leaderboards(conn, [result_id])
+
+        counted = conn.execute(
+            "SELECT players FROM game_player_counts WHERE game_type = ?;", (game_type,)
+        ).fetchone()
+        total_players = counted["players"] if counted else 0
+        placement = {"id": result_id, "total_players": total_players}
+        # Результат без регистрации сохраняется, но в рейтинги не попадает.
+        placed = _player_rank(conn, registration_id, game_type)
+        if placed is not None:
+            rank, row = placed
+            placement["rank"] = rank
+            placement["percentile"] = round(100 * (total_players - rank + 1) / total_players, 1)
+            placement["team_position"] = _team_position(conn, row["team"])
+        _commit(conn, "game_results")
+        return placement
+
+
+# Лимит параметров в одном запросе SQLite (SQLITE_MAX_VARIABLE_NUMBER) с запасом.
+_IN_CHUNK_SIZE = 500
+
+
+@_timed
+def create_game_results_batch(
+    items: list[tuple[int, str, int, str | None]],
+) -> list[tuple[str, int | None]]:
+    """Пакетная запись результатов (registration_id, game_type, moves, idempotency_key).
+
+    Всё пишется одной транзакцией. Для каждого элемента возвращает
+    ("created", id) или ("already_played", None). Повтор элемента с уже
+    известным ключом идемпотентности снова даёт ("created", id) исходной записи.
+    """
+    with _write_connection() as conn:
+        keys = list({item[3] for item in items if item[3]})
+        known: dict[str, int] = {}
+        for start in range(0, len(keys), _IN_CHUNK_SIZE):
+            chunk = keys[start : start + _IN_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = conn.execute(
+                f"""
+                SELECT id, idempotency_key FROM game_results
+                WHERE idempotency_key IN ({placeholders});
+                """,
+                chunk,
+            )
+            known.update((row["idempotency_key"], int(row["id"])) for row in cursor)
+
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM game_results;").fetchone()[0]
+        conn.executemany(
+            """
+            INSERT INTO game_results (registration_id, game_type, moves, idempotency_key)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT DO NOTHING;
+            """,
+            [item for item in items if not (item[3] and item[3] in known)],
+        )
+        # Запись идёт под блокировкой писателя: всё, что новее last_id, вставили мы.
         cursor = conn.execute(
-            "INSERT INTO game_results (registration_id, game_type, moves) VALUES (?, ?, ?)",
-            (registration_id, game_type, moves),
+            """
+            SELECT id, registration_id, game_type, idempotency_key
+            FROM game_results WHERE id > ? ORDER BY id;
+            """,
+            (last_id,),
         )
-        conn.commit()
-        return int(cursor.lastrowid)
-    finally:
-        conn.close()
+        created: dict[tuple[int, str], int] = {}
+        for row in cursor:
+            created[(row["registration_id"], row["game_type"])] = int(row["id"])
+            if row["idempotency_key"]:
+                known[row["idempotency_key"]] = int(row["id"])
 
+        results: list[tuple[str, int | None]] = []
+        claimed: set[tuple[int, str]] = set()
+        for registration_id, game_type, _, key in items:
+            pair = (registration_id, game_type)
+            if key and key in known:
+                results.append(("created", known[key]))
+            elif pair in created and pair not in claimed:
+                results.append(("created", created[pair]))
+            else:
+                results.append(("already_played", None))
+            claimed.add(pair)
 
+        if created:
+            _apply_results_to_leaderboards(conn, sorted(created.values()))
+        _commit(conn, *(["game_results"] if created else []))
+        return results
+
+
+@_timed
 def get_teams() -> list[sqlite3.Row]:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         cursor = conn.execute(
             """
             SELECT team, media_path
@@ -247,13 +803,11 @@ def get_teams() -> list[sqlite3.Row]:
             """
         )
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 
+@_timed
 def upsert_team(team: str, media_path: str) -> None:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute("SELECT sort_order FROM teams WHERE team = ?;", (team,))
         row = cursor.fetchone()
         if row:
@@ -274,14 +828,12 @@ def upsert_team(team: str, media_path: str) -> None:
             """,
             (team, media_path, sort_order),
         )
-        conn.commit()
-    finally:
-        conn.close()
+        _commit(conn, "teams")
 
 
+@_timed
 def update_team(old_team: str, new_team: str, media_path: str) -> bool:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute("SELECT id FROM teams WHERE team = ?;", (old_team,))
         row = cursor.fetchone()
         if not row:
@@ -301,163 +853,386 @@ def update_team(old_team: str, new_team: str, media_path: str) -> bool:
                 "UPDATE registrations SET team = ? WHERE team = ?;",
                 (new_team, old_team),
             )
-        conn.commit()
+            _rebuild_team_leaderboards(conn)
+        _commit(conn, "teams", "registrations")
         return True
-    finally:
-        conn.close()
 
 
+@_timed
 def delete_team(team: str) -> bool:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute("DELETE FROM teams WHERE team = ?;", (team,))
-        conn.commit()
+        _commit(conn, "teams")
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
-def get_stats(game_type: str | None = None) -> list[sqlite3.Row]:
-    conn = get_connection()
-    try:
-        if game_type:
-            cursor = conn.execute(
-                """
-                SELECT
-                    r.id AS registration_id,
-                    r.fio AS fio,
-                    r.team AS team,
-                    COUNT(gr.id) AS games_count,
-                    MIN(gr.moves) AS best_moves,
-                    MAX(gr.created_at) AS last_played
-                FROM registrations r
-                JOIN game_results gr ON gr.registration_id = r.id AND gr.game_type = ?
-                GROUP BY r.id
-                ORDER BY best_moves ASC, games_count DESC, last_played DESC, fio COLLATE NOCASE ASC;
-                """,
-                (game_type,),
-            )
-        else:
-            cursor = conn.execute(
-                """
-                SELECT
-                    r.id AS registration_id,
-                    r.fio AS fio,
-                    r.team AS team,
-                    COUNT(gr.id) AS games_count,
-                    MIN(gr.moves) AS best_moves,
-                    MAX(gr.created_at) AS last_played
-                FROM registrations r
-                JOIN game_results gr ON gr.registration_id = r.id
-                GROUP BY r.id
-                ORDER BY best_moves ASC, games_count DESC, last_played DESC, fio COLLATE NOCASE ASC;
-                """
-            )
-        return cursor.fetchall()
-    finally:
-        conn.close()
+_PLAYER_BOARD_BY_GAME = """
+    SELECT
+        p.registration_id AS registration_id,
+        r.fio AS fio,
+        r.team AS team,
+        p.games_count AS games_count,
+        p.best_moves AS best_moves,
+        p.last_played AS last_played
+    FROM player_game_stats p
+    JOIN registrations r ON r.id = p.registration_id
+    WHERE p.game_type = :game_type
+"""
+
+_PLAYER_BOARD_ALL = """
+    SELECT
+        p.registration_id AS registration_id,
+        r.fio AS fio,
+        r.team AS team,
+        SUM(p.games_count) AS games_count,
+        MIN(p.best_moves) AS best_moves,
+        MAX(p.last_played) AS last_played
+    FROM player_game_stats p
+    JOIN registrations r ON r.id = p.registration_id
+    GROUP BY p.registration_id
+"""
+
+# Порядок рейтинга игроков; registration_id делает его строгим для курсоров.
+_PLAYER_ORDER = (
+    "best_moves ASC, games_count DESC, last_played DESC, "
+    "fio COLLATE NOCASE ASC, registration_id ASC"
+)
+_PLAYER_ORDER_REVERSED = (
+    "best_moves DESC, games_count ASC, last_played ASC, "
+    "fio COLLATE NOCASE DESC, registration_id DESC"
+)
+
+# Строка стоит в рейтинге после ключа (:best_moves, :games_count, ...).
+# Внешнее условие по best_moves даёт планировщику диапазон по индексу.
+_PLAYER_AFTER_KEY = """
+    best_moves >= :best_moves AND (
+        best_moves > :best_moves
+        OR (best_moves = :best_moves AND (
+            games_count < :games_count
+            OR (games_count = :games_count AND (
+                last_played < :last_played
+                OR (last_played = :last_played AND (
+                    fio COLLATE NOCASE > :fio
+                    OR (fio COLLATE NOCASE = :fio AND registration_id > :registration_id)
+                ))
+            ))
+        ))
+    )
+"""
+
+# Строка стоит в рейтинге перед ключом.
+_PLAYER_BEFORE_KEY = """
+    best_moves <= :best_moves AND (
+        best_moves < :best_moves
+        OR (best_moves = :best_moves AND (
+            games_count > :games_count
+            OR (games_count = :games_count AND (
+                last_played > :last_played
+                OR (last_played = :last_played AND (
+                    fio COLLATE NOCASE < :fio
+                    OR (fio COLLATE NOCASE = :fio AND registration_id < :registration_id)
+                ))
+            ))
+        ))
+    )
+"""
+
+# Строго лучший результат, без учёта ФИО (колонки player_game_stats).
+_PLAYER_BETTER_SCORE = """
+    best_moves <= :best_moves AND (
+        best_moves < :best_moves
+        OR (best_moves = :best_moves AND (
+            games_count > :games_count
+            OR (games_count = :games_count AND last_played > :last_played)
+        ))
+    )
+"""
+
+PLAYER_KEY_FIELDS = ("best_moves", "games_count", "last_played", "fio", "registration_id")
+
+
+def _player_board(game_type: str | None) -> str:
+    board = _PLAYER_BOARD_BY_GAME if game_type else _PLAYER_BOARD_ALL
+    return f"WITH board AS ({board}) SELECT * FROM board"
+
+
+@_timed
+def get_stats(
+    game_type: str | None = None,
+    limit: int | None = None,
+    after: dict | None = None,
+) -> list[sqlite3.Row]:
+    """Рейтинг игроков; `after` — ключ последней строки предыдущей страницы."""
+    query = _player_board(game_type)
+    params: dict = {"game_type": game_type, "limit": limit}
+    if after:
+        query += f" WHERE {_PLAYER_AFTER_KEY}"
+        params.update({field: after[field] for field in PLAYER_KEY_FIELDS})
+    query += f" ORDER BY {_PLAYER_ORDER}"
+    if limit is not None:
+        query += " LIMIT :limit"
+    with _connection() as conn:
+        return conn.execute(query + ";", params).fetchall()
 
 
+def _player_rank(
+    conn: sqlite3.Connection, registration_id: int, game_type: str | None
+) -> tuple[int, sqlite3.Row] | None:
+    """Место игрока и его строка рейтинга; None, если он ещё не играл.
+
+    В рейтинге одной игры строки с лучшим результатом считаются по индексу
+    рейтинга без соединения с registrations; ФИО сравнивается только у
+    полных совпадений по результату.
+    """
+    board = _player_board(game_type)
+    row = conn.execute(
+        f"{board} WHERE registration_id = :registration_id;",
+        {"game_type": game_type, "registration_id": registration_id},
+    ).fetchone()
+    if not row:
+        return None
+    params = {"game_type": game_type, **{field: row[field] for field in PLAYER_KEY_FIELDS}}
+    if not game_type:
+        # Общий рейтинг агрегирован по участнику, индекс по строкам тут не поможет.
+        ahead = conn.execute(
+            f"WITH ranked AS ({board} WHERE {_PLAYER_BEFORE_KEY}) SELECT COUNT(*) FROM ranked;",
+            params,
+        ).fetchone()[0]
+        return 1 + ahead, row
+    ahead = conn.execute(
+        f"SELECT COUNT(*) FROM player_game_stats "
+        f"WHERE game_type = :game_type AND {_PLAYER_BETTER_SCORE};",
+        params,
+    ).fetchone()[0]
+    tied = conn.execute(
+        f"""
+        WITH tied AS ({board} WHERE best_moves = :best_moves
+            AND games_count = :games_count AND last_played = :last_played)
+        SELECT COUNT(*) FROM tied WHERE {_PLAYER_BEFORE_KEY};
+        """,
+        params,
+    ).fetchone()[0]
+    return 1 + ahead + tied, row
+
+
+def _team_position(conn: sqlite3.Connection, team: str) -> int | None:
+    """Место команды в командном зачёте (порядок `get_team_total_standings`)."""
+    row = conn.execute(
+        "SELECT games_played, total_score FROM team_total_stats WHERE team = ?;", (team,)
+    ).fetchone()
+    if not row:
+        return None
+    ahead = conn.execute(
+        """
+        SELECT COUNT(*) FROM team_total_stats
+        WHERE games_played >= :games_played AND (
+            games_played > :games_played
+            OR (games_played = :games_played AND (
+                total_score < :total_score
+                OR (total_score = :total_score AND team COLLATE NOCASE < :team)
+            ))
+        );
+        """,
+        {"games_played": row["games_played"], "total_score": row["total_score"], "team": team},
+    ).fetchone()[0]
+    return 1 + ahead
+
+
+@_timed
+def get_player_rank_window(
+    registration_id: int, game_type: str | None, around: int
+) -> tuple[int, list[sqlite3.Row]] | None:
+    """Место игрока и до `around` соседей с каждой стороны.
+
+    Возвращает (место первой строки окна, строки) или None, если игрок
+    ещё не играл. Читается только окно, а не весь рейтинг.
+    """
+    board = _player_board(game_type)
+    params: dict = {"game_type": game_type, "around": around}
+    with _connection() as conn:
+        placed = _player_rank(conn, registration_id, game_type)
+        if placed is None:
+            return None
+        rank, row = placed
+        params.update({field: row[field] for field in PLAYER_KEY_FIELDS})
+        before = conn.execute(
+            f"{board} WHERE {_PLAYER_BEFORE_KEY} "
+            f"ORDER BY {_PLAYER_ORDER_REVERSED} LIMIT :around;",
+            params,
+        ).fetchall()
+        after = conn.execute(
+            f"{board} WHERE {_PLAYER_AFTER_KEY} ORDER BY {_PLAYER_ORDER} LIMIT :around;",
+            params,
+        ).fetchall()
+    return rank - len(before), [*reversed(before), row, *after]
+
+
+_TEAM_BOARD_BY_GAME = """
+    SELECT team, games_count, best_moves, last_played
+    FROM team_game_stats
+    WHERE game_type = ?
+    ORDER BY best_moves ASC, games_count DESC, last_played DESC, team COLLATE NOCASE ASC;
+"""
+
+_TEAM_TOTAL_STANDINGS = """
+    SELECT
+        team,
+        games_played,
+        total_score,
+        memo_best,
+        truth_or_myth_best,
+        reaction_best
+    FROM team_total_stats
+    ORDER BY games_played DESC, total_score ASC, team COLLATE NOCASE ASC;
+"""
+
+
+@_timed
+def get_victory_boards(game_types: tuple[str, ...]) -> dict:
+    """Рейтинги игр и командный зачёт для экрана победы одной транзакцией чтения.
+
+    Возвращает словарь: players и teams (строки рейтингов по типу игры, в
+    порядке `get_stats` и `get_team_stats`) и team_totals.
+    """
+    with _read_snapshot() as conn:
+        players = {
+            game_type: conn.execute(
+                f"{_player_board(game_type)} ORDER BY {_PLAYER_ORDER};", {"game_type": game_type}
+            ).fetchall()
+            for game_type in game_types
+        }
+        teams = {
+            game_type: conn.execute(_TEAM_BOARD_BY_GAME, (game_type,)).fetchall()
+            for game_type in game_types
+        }
+        team_totals = conn.execute(_TEAM_TOTAL_STANDINGS).fetchall()
+    return {"players": players, "teams": teams, "team_totals": team_totals}
+
+
+@_timed
+def get_registration_video(registration_id: int) -> sqlite3.Row | None:
+    """Команда участника и media_path её видео (None, если команды нет в teams)."""
+    with _connection() as conn:
+        return conn.execute(
+            """
+            SELECT r.id, r.team, t.media_path
+            FROM registrations r
+            LEFT JOIN teams t ON t.team = r.team
+            WHERE r.id = ?;
+            """,
+            (registration_id,),
+        ).fetchone()
+
+
+@_timed
 def get_team_stats(game_type: str | None = None) -> list[sqlite3.Row]:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         if game_type:
-            cursor = conn.execute(
-                """
-                SELECT
-                    r.team AS team,
-                    COUNT(gr.id) AS games_count,
-                    MIN(gr.moves) AS best_moves,
-                    MAX(gr.created_at) AS last_played
-                FROM registrations r
-                JOIN game_results gr ON gr.registration_id = r.id AND gr.game_type = ?
-                GROUP BY r.team
-                ORDER BY best_moves ASC, games_count DESC, last_played DESC, team COLLATE NOCASE ASC;
-                """,
-                (game_type,),
-            )
+            cursor = conn.execute(_TEAM_BOARD_BY_GAME, (game_type,))
         else:
             cursor = conn.execute(
                 """
                 SELECT
-                    r.team AS team,
-                    COUNT(gr.id) AS games_count,
-                    MIN(gr.moves) AS best_moves,
-                    MAX(gr.created_at) AS last_played
-                FROM registrations r
-                JOIN game_results gr ON gr.registration_id = r.id
-                GROUP BY r.team
+                    team,
+                    SUM(games_count) AS games_count,
+                    MIN(best_moves) AS best_moves,
+                    MAX(last_played) AS last_played
+                FROM team_game_stats
+                GROUP BY team
                 ORDER BY best_moves ASC, games_count DESC, last_played DESC, team COLLATE NOCASE ASC;
                 """
             )
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 
+@_timed
 def get_team_total_standings() -> list[sqlite3.Row]:
     """Командный зачёт: 1) больше игр — лучше, 2) при равенстве — меньше сумма очков лучше."""
-    conn = get_connection()
-    try:
+    with _connection() as conn:
+        cursor = conn.execute(_TEAM_TOTAL_STANDINGS)
+        return cursor.fetchall()
+
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = (
+    "registration_id",
+    "fio",
+    "team",
+    "email",
+    "registered_at",
+    "result_id",
+    "game_type",
+    "moves",
+    "played_at",
+)
+
+
+@_timed
+def iter_results_export(
+    team: str | None = None, game_type: str | None = None
+) -> Iterator[list[sqlite3.Row]]:
+    """Регистрации вместе с результатами игр, пачками по EXPORT_BATCH_SIZE строк.
+
+    Строки читаются курсором по мере потребления, поэтому память не зависит
+    от объёма выгрузки. Соединение своё, вне пула (см. `_export_connection`),
+    и открыто, пока генератор не исчерпан или не закрыт. С фильтром
+    `game_type` в выгрузку попадают только сыгравшие в эту игру, без него —
+    и участники без результатов.
+    """
+    conditions = []
+    params: dict[str, str] = {}
+    join = "LEFT JOIN game_results gr ON gr.registration_id = r.id"
+    if game_type is not None:
+        # CROSS JOIN закрепляет порядок обхода: от registrations, без сортировки.
+        join = (
+            "CROSS JOIN game_results gr"
+            " ON gr.registration_id = r.id AND gr.game_type = :game_type"
+        )
+        params["game_type"] = game_type
+    if team is not None:
+        conditions.append("r.team = :team")
+        params["team"] = team
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with _export_connection() as conn:
         cursor = conn.execute(
-            """
-            WITH by_team_game AS (
-                SELECT r.team, gr.game_type, MIN(gr.moves) AS best_moves
-                FROM registrations r
-                JOIN game_results gr ON gr.registration_id = r.id
-                GROUP BY r.team, gr.game_type
-            )
+            f"""
             SELECT
-                team,
-                COUNT(*) AS games_played,
-                SUM(best_moves) AS total_score,
-                MAX(CASE WHEN game_type = 'memo' THEN best_moves END) AS memo_best,
-                MAX(CASE WHEN game_type = 'truth_or_myth' THEN best_moves END) AS truth_or_myth_best,
-                MAX(CASE WHEN game_type = 'reaction' THEN best_moves END) AS reaction_best
-            FROM by_team_game
-            GROUP BY team
-            ORDER BY games_played DESC, total_score ASC, team COLLATE NOCASE ASC;
-            """
+                r.id AS registration_id,
+                r.fio,
+                r.team,
+                r.email,
+                r.created_at AS registered_at,
+                gr.id AS result_id,
+                gr.game_type,
+                gr.moves,
+                gr.created_at AS played_at
+            FROM registrations r
+            {join}
+            {where}
+            ORDER BY r.id, gr.game_type;
+            """,
+            params,
         )
-        return cursor.fetchall()
-    finally:
-        conn.close()
+        while rows := cursor.fetchmany(EXPORT_BATCH_SIZE):
+            yield rows
 
 
+@_timed
 def reset_all_game_results() -> int:
     """Delete all rows from game_results. Returns number of deleted rows."""
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute("DELETE FROM game_results;")
-        conn.commit()
+        _rebuild_leaderboards(conn)
+        _commit(conn, "game_results")
         return cursor.rowcount
-    finally:
-        conn.close()
-
-
-def get_truth_or_myth_questions(limit: int) -> list[sqlite3.Row]:
-    conn = get_connection()
-    try:
-        cursor = conn.execute(
-            """
-            SELECT id, statement, is_true
-            FROM truth_or_myth_questions
-            WHERE is_active = 1
-            ORDER BY RANDOM()
-            LIMIT ?;
-            """,
-            (limit,),
-        )
-        return cursor.fetchall()
-    finally:
-        conn.close()
 
 
+@_timed
 def list_truth_or_myth_questions(
     include_inactive: bool = True,
 ) -> list[sqlite3.Row]:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         query = """
             SELECT id, statement, is_true, is_active
             FROM truth_or_myth_questions
@@ -467,15 +1242,13 @@ def list_truth_or_myth_questions(
         query += " ORDER BY id ASC;"
         cursor = conn.execute(query)
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 
+@_timed
 def create_truth_or_myth_question(
     statement: str, is_true: bool, is_active: bool
 ) -> str:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         question_id = uuid4().hex
         conn.execute(
             """
@@ -484,17 +1257,15 @@ def create_truth_or_myth_question(
             """,
             (question_id, statement, int(is_true), int(is_active)),
         )
-        conn.commit()
+        _commit(conn, "truth_or_myth_questions")
         return question_id
-    finally:
-        conn.close()
 
 
+@_timed
 def update_truth_or_myth_question(
     question_id: str, statement: str, is_true: bool, is_active: bool
 ) -> bool:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute(
             """
             UPDATE truth_or_myth_questions
@@ -503,28 +1274,105 @@ def update_truth_or_myth_question(
             """,
             (statement, int(is_true), int(is_active), question_id),
         )
-        conn.commit()
+        _commit(conn, "truth_or_myth_questions")
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
+@_timed
 def delete_truth_or_myth_question(question_id: str) -> bool:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute(
             "DELETE FROM truth_or_myth_questions WHERE id = ?;",
             (question_id,),
         )
-        conn.commit()
+        _commit(conn, "truth_or_myth_questions")
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
+QUESTION_EXPORT_FIELDS = ("id", "statement", "is_true", "is_active")
+
+
+@_timed
+def iter_truth_or_myth_questions() -> Iterator[list[dict]]:
+    """Все вопросы «правда или миф» пачками по EXPORT_BATCH_SIZE (для выгрузки)."""
+    with _export_connection() as conn:
+        cursor = conn.execute(
+            """
+            SELECT id, statement, is_true, is_active
+            FROM truth_or_myth_questions
+            ORDER BY id ASC;
+            """
+        )
+        while rows := cursor.fetchmany(EXPORT_BATCH_SIZE):
+            yield [
+                {
+                    "id": row["id"],
+                    "statement": row["statement"],
+                    "is_true": bool(row["is_true"]),
+                    "is_active": bool(row["is_active"]),
+                }
+                for row in rows
+            ]
+
+
+@_timed
+def import_truth_or_myth_questions(
+    items: list[tuple[str, str, bool, bool]], replace: bool = False
+) -> dict[str, int]:
+    """Вставляет и обновляет вопросы по id одной транзакцией.
+
+    `items` — (id, statement, is_true, is_active); при повторе id побеждает
+    последний. С `replace=True` вопросы, которых нет в импорте, удаляются.
+    Возвращает сводку: сколько создано, обновлено, не изменилось и удалено.
+    """
+    incoming = {
+        question_id: (statement, int(is_true), int(is_active))
+        for question_id, statement, is_true, is_active in items
+    }
+    with _write_connection() as conn:
+        existing = {
+            row["id"]: (row["statement"], row["is_true"], row["is_active"])
+            for row in conn.execute(
+                "SELECT id, statement, is_true, is_active FROM truth_or_myth_questions;"
+            )
+        }
+        created = [
+            (question_id, *values)
+            for question_id, values in incoming.items()
+            if question_id not in existing
+        ]
+        updated = [
+            (question_id, *values)
+            for question_id, values in incoming.items()
+            if question_id in existing and existing[question_id] != values
+        ]
+        conn.executemany(
+            """
+            INSERT INTO truth_or_myth_questions (id, statement, is_true, is_active)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                statement = excluded.statement,
+                is_true = excluded.is_true,
+                is_active = excluded.is_active;
+            """,
+            created + updated,
+        )
+        stale = []
+        if replace:
+            stale = [(question_id,) for question_id in existing if question_id not in incoming]
+            conn.executemany("DELETE FROM truth_or_myth_questions WHERE id = ?;", stale)
+        _commit(conn, *(["truth_or_myth_questions"] if created or updated or stale else []))
+        return {
+            "created": len(created),
+            "updated": len(updated),
+            "unchanged": len(incoming) - len(created) - len(updated),
+            "deleted": len(stale),
+        }
+
+
+@_timed
 def list_true_false_questions(include_inactive: bool = True) -> list[sqlite3.Row]:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         query = """
             SELECT id, question, answer, is_active
             FROM true_false_questions
@@ -535,13 +1383,11 @@ def list_true_false_questions(include_inactive: bool = True) -> list[sqlite3.Row
         query += " ORDER BY id ASC;"
         cursor = conn.execute(query, params)
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 
+@_timed
 def get_true_false_question(question_id: int) -> sqlite3.Row | None:
-    conn = get_connection()
-    try:
+    with _connection() as conn:
         cursor = conn.execute(
             """
             SELECT id, question, answer, is_active
@@ -551,13 +1397,11 @@ def get_true_false_question(question_id: int) -> sqlite3.Row | None:
             (question_id,),
         )
         return cursor.fetchone()
-    finally:
-        conn.close()
 
 
+@_timed
 def create_true_false_question(question: str, answer: bool, is_active: bool) -> int:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute(
             """
             INSERT INTO true_false_questions (question, answer, is_active)
@@ -565,17 +1409,15 @@ def create_true_false_question(question: str, answer: bool, is_active: bool) ->
             """,
             (question, int(answer), int(is_active)),
         )
-        conn.commit()
+        _commit(conn, "true_false_questions")
         return int(cursor.lastrowid)
-    finally:
-        conn.close()
 
 
+@_timed
 def update_true_false_question(
     question_id: int, question: str, answer: bool, is_active: bool
 ) -> bool:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute(
             """
             UPDATE true_false_questions
@@ -584,20 +1426,16 @@ def update_true_false_question(
             """,
             (question, int(answer), int(is_active), question_id),
         )
-        conn.commit()
+        _commit(conn, "true_false_questions")
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
+@_timed
 def delete_true_false_question(question_id: int) -> bool:
-    conn = get_connection()
-    try:
+    with _write_connection() as conn:
         cursor = conn.execute(
             "DELETE FROM true_false_questions WHERE id = ?;",
             (question_id,),
         )
-        conn.commit()
+        _commit(conn, "true_false_questions")
         return cursor.rowcount > 0
-    finally:
-        conn.close()
@@ -0,0 +1,112 @@
+"""Рассылка изменений рейтинга подписчикам (Server-Sent Events)."""
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 16
+KEEPALIVE_SECONDS = 15.0
+
+
+def _format_event(event: str, payload: dict, event_id: int) -> str:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def diff_snapshots(previous: dict, current: dict) -> dict:
+    """Компактная разница двух снимков: только изменившиеся команды и топы игр."""
+    diff: dict = {}
+    old_totals = {entry["team"]: entry for entry in previous["team_totals"]}
+    new_totals = {entry["team"]: entry for entry in current["team_totals"]}
+    upsert = [entry for team, entry in new_totals.items() if old_totals.get(team) != entry]
+    removed = [team for team in old_totals if team not in new_totals]
+    order = list(new_totals)
+    if upsert or removed or order != list(old_totals):
+        diff["team_totals"] = {"upsert": upsert, "removed": removed, "order": order}
+    top = {
+        game_type: entries
+        for game_type, entries in current["top"].items()
+        if previous["top"].get(game_type) != entries
+    }
+    if top:
+        diff["top"] = top
+    return diff
+
+
+class LeaderboardBroadcaster:
+    """Один производитель на всех подписчиков.
+
+    После коммита записи вызывается `notify()` (из любого потока). Задача
+    `run()` один раз строит снимок рейтинга, сравнивает его с предыдущим и
+    раскладывает разницу по очередям подписчиков. Уведомления, пришедшие во
+    время построения снимка, склеиваются в одно.
+    """
+
+    def __init__(self, build_snapshot: Callable[[], Awaitable[dict]]) -> None:
+        self._build_snapshot = build_snapshot
+        self._subscribers: set[asyncio.Queue] = set()
+        self._changed = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._snapshot: dict | None = None
+        self._event_id = 0
+
+    def notify(self) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._changed.set)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._changed.set()
+        try:
+            while True:
+                await self._changed.wait()
+                self._changed.clear()
+                try:
+                    snapshot = await self._build_snapshot()
+                except Exception:
+                    logger.exception("Не удалось построить снимок рейтинга")
+                    continue
+                previous, self._snapshot = self._snapshot, snapshot
+                if previous is None:
+                    # Подписчики, пришедшие до первого снимка, ещё ничего не получали.
+                    self._publish("snapshot", snapshot)
+                else:
+                    diff = diff_snapshots(previous, snapshot)
+                    if diff:
+                        self._publish("diff", diff)
+        finally:
+            self._loop = None
+
+    def _publish(self, event: str, payload: dict) -> None:
+        self._event_id += 1
+        message = _format_event(event, payload, self._event_id)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Медленный подписчик: выбрасываем его очередь и шлём полный снимок.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_format_event("snapshot", self._snapshot, self._event_id))
+
+    async def stream(self) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            if self._snapshot is not None:
+                yield _format_event("snapshot", self._snapshot, self._event_id)
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
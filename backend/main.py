@@ -1,45 +1,196 @@
+import asyncio
+import base64
+from collections.abc import Callable
+from contextlib import asynccontextmanager, suppress
+import hashlib
+import json
 import os
 from pathlib import Path
-import shutil
 from urllib.parse import quote
+from uuid import uuid4
 
-from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, UploadFile
+from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
+import adb
+import bulk_io
+from cache import ResponseCache
 import db
+from live import LeaderboardBroadcaster
+from media_files import MediaFiles
+from media_index import ROOT_KEY, MediaIndex, media_stamp
+import metrics
 from models import (
     AdminVerifyIn,
+    GameResultBatchIn,
+    GameResultBatchItem,
+    GameResultBatchOut,
+    GameResultBatchStatus,
     GameResultIn,
     GameResultOut,
+    RegistrationImportOut,
+    RegistrationImportRow,
     RegistrationIn,
     RegistrationOut,
     StatsResponse,
     TeamEntry,
     TeamListResponse,
     TeamStatsResponse,
-    TeamTotalEntry,
     TeamTotalStatsResponse,
     TruthOrMythAdminEntry,
     TruthOrMythAdminIn,
     TruthOrMythAdminList,
+    TruthOrMythImportItem,
+    TruthOrMythImportOut,
     TruthOrMythResponse,
+    VictoryBoard,
+    VictoryBoards,
+    VictoryPlacement,
+    VictoryResponse,
     TrueFalseQuestion,
     TrueFalseQuestionIn,
     TrueFalseQuestionList,
     VideoEntry,
     VideoListResponse,
+    VideoUploadIn,
+    VideoUploadPart,
+    VideoUploadStatus,
 )
+from question_pool import QuestionPool
+from startup import StartupPipeline
+from uploads import UploadSession, UploadSessions, save_upload
 
 MEDIA_DIR = Path(__file__).resolve().parent / "media"
 TEAM_VIDEO_BASENAME = "congrats"
 DEFAULT_TEAM_KEY = "default"
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin")
+LEADERBOARD_CACHE_TTL = float(os.environ.get("LEADERBOARD_CACHE_TTL", "30"))
+LIVE_TOP_SIZE = int(os.environ.get("LIVE_TOP_SIZE", "10"))
+MAX_VIDEO_UPLOAD_BYTES = int(os.environ.get("MAX_VIDEO_UPLOAD_MB", "1024")) * 1024 * 1024
+# Период сверки индекса media с диском, секунды; 0 — не следить.
+MEDIA_WATCH_INTERVAL = float(os.environ.get("MEDIA_WATCH_INTERVAL", "0"))
+# Период сверки с изменениями других воркеров, секунды; 0 — один процесс.
+CHANGE_POLL_INTERVAL = float(os.environ.get("CHANGE_POLL_INTERVAL", "0.5"))
+GAME_TYPES = ("memo", "truth_or_myth", "reaction")
+# Таблицы, изменение которых сбрасывает кэш рейтингов.
+LEADERBOARD_TABLES = frozenset({"game_results", "teams"})
+# Клиент хранит ответ, но перепроверяет его по ETag при каждом запросе.
+CATALOG_CACHE_CONTROL = "no-cache"
 
-app = FastAPI()
+leaderboard_cache = ResponseCache(ttl=LEADERBOARD_CACHE_TTL)
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "leaderboard_cache_hits_total",
+    "Ответы рейтингов из кэша.",
+    lambda: leaderboard_cache.hits,
+    kind="counter",
+))
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "leaderboard_cache_misses_total",
+    "Ответы рейтингов, построенные заново.",
+    lambda: leaderboard_cache.misses,
+    kind="counter",
+))
 
 
-def verify_admin(
+def _live_snapshot() -> dict:
+    return {
+        "team_totals": [_team_total_entry(row) for row in db.get_team_total_standings()],
+        "top": {
+            game_type: [_stats_entry(row) for row in db.get_stats(game_type, LIVE_TOP_SIZE)]
+            for game_type in GAME_TYPES
+        },
+    }
+
+
+live_leaderboard = LeaderboardBroadcaster(lambda: adb.run_read(_live_snapshot))
+
+
+def _invalidate_leaderboards(tables: frozenset[str]) -> None:
+    if tables & LEADERBOARD_TABLES:
+        leaderboard_cache.clear()
+        live_leaderboard.notify()
+
+
+question_pool = QuestionPool(
+    lambda: db.list_truth_or_myth_questions(include_inactive=False)
+)
+
+
+def _invalidate_questions(tables: frozenset[str]) -> None:
+    if "truth_or_myth_questions" in tables:
+        question_pool.invalidate()
+
+
+db.add_change_listener(_invalidate_leaderboards)
+db.add_change_listener(_invalidate_questions)
+
+media_index = MediaIndex(MEDIA_DIR, TEAM_VIDEO_BASENAME)
+
+
+def _reload_media_index(tables: frozenset[str]) -> None:
+    # Видео загрузили через другой воркер: его индекс уже обновлён, наш — нет.
+    if "media" in tables:
+        media_index.rebuild()
+
+
+db.add_remote_change_listener(_reload_media_index)
+
+# Сессии докачки лежат в скрытом каталоге: индекс и /media их не видят.
+upload_sessions = UploadSessions(MEDIA_DIR / ".uploads", MAX_VIDEO_UPLOAD_BYTES)
+
+
+startup = StartupPipeline()
+
+
+def _scan_team_videos() -> dict[str, str | None]:
+    media_index.rebuild()
+    return media_index.team_videos()
+
+
+async def _refresh_media_index() -> None:
+    # Пока индекс строился, ответы могли уйти с ETag пустого индекса.
+    if await asyncio.to_thread(media_index.rebuild):
+        await adb.run_write(db.mark_changed, "media")
+
+
+async def _warm_caches(media_scanned: bool) -> None:
+    if not media_scanned:
+        await startup.warm("media_index", _refresh_media_index)
+    await startup.warm("question_pool", adb.run_read, question_pool.refresh)
+    await startup.warm("leaderboards", _warm_leaderboards)
+    startup.mark_ready()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # До приёма запросов — только схема; если media и схема не менялись,
+    # рейтинги не пересчитываются, а индекс media строится уже в прогреве.
+    stamp = await startup.step("media_stamp", asyncio.to_thread, media_stamp, MEDIA_DIR)
+    startup.full_init = await startup.step("init_db", adb.init_db, _scan_team_videos, stamp)
+    db.start_change_poller(CHANGE_POLL_INTERVAL)
+    warm_task = asyncio.create_task(_warm_caches(media_scanned=startup.full_init))
+    live_task = asyncio.create_task(live_leaderboard.run())
+    media_index.start_watcher(
+        MEDIA_WATCH_INTERVAL, lambda: db.mark_changed("media")
+    )
+    yield
+    media_index.stop_watcher()
+    db.stop_change_poller()
+    for task in (warm_task, live_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    adb.shutdown()
+    db.close_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def verify_admin(
     x_admin_password: str | None = Header(default=None, alias="X-Admin-Password"),
 ) -> None:
     if not x_admin_password or x_admin_password != ADMIN_PASSWORD:
@@ -52,10 +203,61 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Внешним слоем: время запроса считается вместе с CORS и обработкой ошибок.
+app.add_middleware(metrics.MetricsMiddleware)
+
+class _NotModified(Exception):
+    def __init__(self, etag: str) -> None:
+        self.etag = etag
+
+
+@app.exception_handler(_NotModified)
+async def not_modified_handler(_: Request, exc: _NotModified) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": exc.etag, "Cache-Control": CATALOG_CACHE_CONTROL},
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
 
-db.init_db()
+def conditional_get(*tables: str):
+    """Зависимость для GET-эндпоинтов, чей ответ определяется таблицами `tables`.
 
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+    ETag строится из счётчиков изменений этих таблиц и строки запроса, так что
+    ответ 304 на If-None-Match отдаётся без обращения к SQLite.
+    """
+
+    async def dependency(request: Request, response: Response) -> dict[str, str]:
+        versions = db.table_versions(*tables)
+        digest = hashlib.blake2s(
+            f"{db.change_epoch()}|{request.url.path}?{request.url.query}|{versions}".encode(),
+            digest_size=12,
+        ).hexdigest()
+        etag = f'"{digest}"'
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            raise _NotModified(etag)
+        headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+        # Эндпоинты, отдающие Response напрямую, передают заголовки сами.
+        response.headers.update(headers)
+        return headers
+
+    return Depends(dependency)
+
+
+@app.exception_handler(db.DatabaseBusyError)
+async def database_busy_handler(_: Request, __: db.DatabaseBusyError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503, content={"detail": "Сервер перегружен, попробуйте ещё раз"}
+    )
+
+
+app.mount("/media", MediaFiles(directory=MEDIA_DIR, index=media_index), name="media")
 
 
 def _team_directory(team_key: str) -> Path:
@@ -66,16 +268,13 @@ def _team_directory(team_key: str) -> Path:
     return MEDIA_DIR / team_key
 
 
-def _find_team_video(directory: Path) -> Path | None:
-    for candidate in sorted(directory.glob(f"{TEAM_VIDEO_BASENAME}.*")):
-        if candidate.is_file():
-            return candidate
-    return None
+def _media_key(team_key: str) -> str:
+    return ROOT_KEY if team_key == DEFAULT_TEAM_KEY else team_key
 
 
-def _build_video_entry(team_key: str, directory: Path, is_default: bool) -> VideoEntry:
-    video_file = _find_team_video(directory)
-    filename = video_file.name if video_file else None
+def _build_video_entry(team_key: str, is_default: bool) -> VideoEntry:
+    video_file = media_index.get(_media_key(team_key))
+    filename = video_file.filename if video_file else None
     if not filename:
         return VideoEntry(
             key=team_key,
@@ -85,9 +284,9 @@ def _build_video_entry(team_key: str, directory: Path, is_default: bool) -> Vide
             is_default=is_default,
         )
     if is_default:
-        url = f"/media/{filename}"
+        url = f"/media/{filename}?v={video_file.version}"
     else:
-        url = f"/media/{quote(team_key)}/{filename}"
+        url = f"/media/{quote(team_key)}/{filename}?v={video_file.version}"
     return VideoEntry(
         key=team_key,
         team=None if is_default else team_key,
@@ -98,38 +297,47 @@ def _build_video_entry(team_key: str, directory: Path, is_default: bool) -> Vide
 
 
 @app.get("/api/health")
-def health() -> dict:
+async def health() -> dict:
     return {"status": "ok"}
 
 
-@app.get("/api/general-congrats")
+@app.get("/api/ready")
+async def ready() -> JSONResponse:
+    """Готовность к нагрузке: 503, пока после запуска идёт прогрев кэшей."""
+    report = {**startup.report(), "schema_version": db.schema_version()}
+    return JSONResponse(report, status_code=200 if startup.ready else 503)
+
+
+@app.get("/api/general-congrats", dependencies=[conditional_get("media")])
 def get_general_congrats() -> dict:
-    """Возвращает path к файлу congrats с любым расширением из корня media."""
-    video_file = _find_team_video(MEDIA_DIR)
+    """Возвращает path к файлу congrats с любым расширением из корня media.
+
+    `version` — метка содержимого: URL с `?v=version` кэшируется навсегда.
+    """
+    video_file = media_index.get(ROOT_KEY)
     if not video_file:
         raise HTTPException(404, "Файл поздравления не найден")
-    filename = video_file.name
-    return {"path": filename}
+    return {"path": video_file.filename, "version": video_file.version}
 
 
 @app.post("/api/register", response_model=RegistrationOut)
-def register(payload: RegistrationIn) -> RegistrationOut:
-    reg_id = db.create_registration(payload.fio, payload.team, payload.email)
+async def register(payload: RegistrationIn) -> RegistrationOut:
+    reg_id = await adb.create_registration(payload.fio, payload.team, payload.email)
     return RegistrationOut(id=reg_id, **payload.model_dump())
 
 
 @app.get("/api/played-games")
-def get_played_games(registration_id: int = Query(gt=0)) -> dict:
-    played = db.get_played_games(registration_id)
+async def get_played_games(registration_id: int = Query(gt=0)) -> dict:
+    played = await adb.get_played_games(registration_id)
     return {"played": played}
 
 
 @app.post("/api/game-result", response_model=GameResultOut)
-def create_game_result(payload: GameResultIn) -> GameResultOut:
-    if payload.game_type not in ("memo", "truth_or_myth", "reaction"):
+async def create_game_result(payload: GameResultIn) -> GameResultOut:
+    if payload.game_type not in GAME_TYPES:
         raise HTTPException(status_code=400, detail="Недопустимый тип игры")
     try:
-        result_id = db.create_game_result(
+        placement = await adb.create_game_result(
             payload.registration_id, payload.moves, payload.game_type
         )
     except ValueError as e:
@@ -139,98 +347,348 @@ def create_game_result(payload: GameResultIn) -> GameResultOut:
                 detail="Вы уже проходили эту игру. Каждую игру можно сыграть только один раз.",
             )
         raise
-    return GameResultOut(id=result_id, **payload.model_dump())
+    return GameResultOut(**placement, **payload.model_dump())
+
+
+@app.post("/api/game-results:batch", response_model=GameResultBatchOut)
+async def create_game_results_batch(payload: GameResultBatchIn) -> GameResultBatchOut:
+    """Пакетная загрузка результатов с киосков, копивших их без сети."""
+    statuses: list[GameResultBatchStatus | None] = []
+    valid: list[tuple[int, GameResultBatchItem]] = []
+    for index, raw in enumerate(payload.items):
+        try:
+            item = GameResultBatchItem.model_validate(raw)
+        except ValidationError as e:
+            error = "; ".join(err["msg"] for err in e.errors())
+            statuses.append(GameResultBatchStatus(index=index, status="invalid", error=error))
+            continue
+        if item.game_type not in GAME_TYPES:
+            statuses.append(
+                GameResultBatchStatus(
+                    index=index, status="invalid", error="Недопустимый тип игры"
+                )
+            )
+            continue
+        statuses.append(None)
+        valid.append((index, item))
+
+    if valid:
+        outcomes = await adb.create_game_results_batch(
+            [
+                (item.registration_id, item.game_type, item.moves, item.idempotency_key)
+                for _, item in valid
+            ]
+        )
+        for (index, _), (status, result_id) in zip(valid, outcomes):
+            statuses[index] = GameResultBatchStatus(index=index, status=status, id=result_id)
+    return GameResultBatchOut(results=statuses)
+
+
+def _json_response(body: bytes, headers: dict | None = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _cached_body(key: tuple, build: Callable[[], bytes]) -> bytes:
+    body, generation = leaderboard_cache.lookup(key)
+    if body is None:
+        body = await adb.run_read(build)
+        leaderboard_cache.store(key, body, generation)
+    return body
+
+
+async def _cached_json_response(
+    key: tuple, build: Callable[[], bytes], headers: dict | None = None
+) -> Response:
+    return _json_response(await _cached_body(key, build), headers)
+
+
+def _stats_entry(row, rank: int | None = None) -> dict:
+    return {
+        "registration_id": int(row["registration_id"]),
+        "fio": row["fio"],
+        "team": row["team"],
+        "games_count": int(row["games_count"]),
+        "best_moves": int(row["best_moves"]),
+        "last_played": row["last_played"],
+        "rank": rank,
+    }
+
+
+def _encode_cursor(row) -> str:
+    key = [row[field] for field in db.PLAYER_KEY_FIELDS]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        best_moves, games_count, last_played, fio, registration_id = key
+        return {
+            "best_moves": int(best_moves),
+            "games_count": int(games_count),
+            "last_played": str(last_played),
+            "fio": str(fio),
+            "registration_id": int(registration_id),
+        }
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def _build_stats(
+    game_type: str | None, limit: int | None = None, after: dict | None = None
+) -> bytes:
+    rows = db.get_stats(game_type, limit + 1 if limit else None, after)
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+    entries = [_stats_entry(row) for row in rows]
+    return StatsResponse(entries=entries, next_cursor=next_cursor).model_dump_json().encode()
+
+
+def _build_rank_window(registration_id: int, game_type: str | None, around: int) -> bytes:
+    window = db.get_player_rank_window(registration_id, game_type, around)
+    if window is None:
+        raise HTTPException(status_code=404, detail="Результат участника не найден")
+    first_rank, rows = window
+    entries = [_stats_entry(row, first_rank + index) for index, row in enumerate(rows)]
+    rank = next(
+        entry["rank"] for entry in entries if entry["registration_id"] == registration_id
+    )
+    return StatsResponse(entries=entries, rank=rank).model_dump_json().encode()
+
+
+def _team_stats_entry(row) -> dict:
+    return {
+        "team": row["team"],
+        "games_count": int(row["games_count"]),
+        "best_moves": int(row["best_moves"]),
+        "last_played": row["last_played"],
+    }
+
+
+def _build_team_stats(game_type: str | None) -> bytes:
+    entries = [_team_stats_entry(row) for row in db.get_team_stats(game_type)]
+    return TeamStatsResponse(entries=entries).model_dump_json().encode()
+
+
+def _team_total_entry(row) -> dict:
+    return {
+        "team": row["team"],
+        "games_played": int(row["games_played"]),
+        "total_score": int(row["total_score"]),
+        "memo_best": int(row["memo_best"]) if row["memo_best"] is not None else None,
+        "truth_or_myth_best": int(row["truth_or_myth_best"]) if row["truth_or_myth_best"] is not None else None,
+        "reaction_best": int(row["reaction_best"]) if row["reaction_best"] is not None else None,
+    }
+
+
+def _build_team_total_stats() -> bytes:
+    entries = [_team_total_entry(row) for row in db.get_team_total_standings()]
+    return TeamTotalStatsResponse(entries=entries).model_dump_json().encode()
 
 
 @app.get("/api/stats", response_model=StatsResponse)
-def get_stats(game_type: str | None = Query(default=None)) -> StatsResponse:
-    if game_type and game_type not in ("memo", "truth_or_myth", "reaction"):
+async def get_stats(
+    game_type: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    after: str | None = Query(default=None),
+    rank_of: int | None = Query(default=None, gt=0),
+    around: int = Query(default=5, ge=0, le=50),
+    cache_headers: dict = conditional_get(*LEADERBOARD_TABLES),
+) -> Response:
+    if game_type and game_type not in GAME_TYPES:
         raise HTTPException(status_code=400, detail="Недопустимый тип игры")
-    entries = [
-        {
-            "registration_id": int(row["registration_id"]),
-            "fio": row["fio"],
-            "team": row["team"],
-            "games_count": int(row["games_count"]),
-            "best_moves": int(row["best_moves"]),
-            "last_played": row["last_played"],
-        }
-        for row in db.get_stats(game_type)
-    ]
-    return StatsResponse(entries=entries)
+    if rank_of is not None:
+        return _json_response(
+            await adb.run_read(_build_rank_window, rank_of, game_type, around),
+            cache_headers,
+        )
+    if after is not None:
+        cursor = _decode_cursor(after)
+        return _json_response(
+            await adb.run_read(_build_stats, game_type, limit, cursor), cache_headers
+        )
+    return await _cached_json_response(
+        ("stats", game_type, limit), lambda: _build_stats(game_type, limit), cache_headers
+    )
 
 
 @app.get("/api/team-stats", response_model=TeamStatsResponse)
-def get_team_stats(game_type: str | None = Query(default=None)) -> TeamStatsResponse:
-    if game_type and game_type not in ("memo", "truth_or_myth", "reaction"):
+async def get_team_stats(
+    game_type: str | None = Query(default=None),
+    cache_headers: dict = conditional_get(*LEADERBOARD_TABLES),
+) -> Response:
+    if game_type and game_type not in GAME_TYPES:
         raise HTTPException(status_code=400, detail="Недопустимый тип игры")
-    entries = [
-        {
-            "team": row["team"],
-            "games_count": int(row["games_count"]),
-            "best_moves": int(row["best_moves"]),
-            "last_played": row["last_played"],
-        }
-        for row in db.get_team_stats(game_type)
-    ]
-    return TeamStatsResponse(entries=entries)
+    return await _cached_json_response(
+        ("team-stats", game_type), lambda: _build_team_stats(game_type), cache_headers
+    )
 
 
 @app.get("/api/team-total-stats", response_model=TeamTotalStatsResponse)
-def get_team_total_stats() -> TeamTotalStatsResponse:
-    entries = [
-        {
-            "team": row["team"],
-            "games_played": int(row["games_played"]),
-            "total_score": int(row["total_score"]),
-            "memo_best": int(row["memo_best"]) if row["memo_best"] is not None else None,
-            "truth_or_myth_best": int(row["truth_or_myth_best"]) if row["truth_or_myth_best"] is not None else None,
-            "reaction_best": int(row["reaction_best"]) if row["reaction_best"] is not None else None,
-        }
-        for row in db.get_team_total_standings()
-    ]
-    return TeamTotalStatsResponse(entries=entries)
+async def get_team_total_stats(
+    cache_headers: dict = conditional_get(*LEADERBOARD_TABLES),
+) -> Response:
+    return await _cached_json_response(
+        ("team-total-stats", None), _build_team_total_stats, cache_headers
+    )
 
 
-@app.get("/api/teams", response_model=TeamListResponse)
-def get_teams() -> TeamListResponse:
+async def _warm_leaderboards() -> None:
+    """Заполняет кэш командных рейтингов теми же ключами, что и эндпоинты.
+
+    Полные рейтинги игроков не прогреваются: на десятках тысяч участников
+    каждый строится сотни миллисекунд, а готовность ждала бы их все.
+    """
+    for game_type in (None, *GAME_TYPES):
+        await _cached_json_response(
+            ("team-stats", game_type), lambda: _build_team_stats(game_type)
+        )
+    await _cached_json_response(("team-total-stats", None), _build_team_total_stats)
+
+
+def _media_url(media_path: str) -> str:
+    """URL видео по пути в media; с меткой ?v=, если файл есть в индексе."""
+    directory, _, filename = media_path.rpartition("/")
+    url = f"/media/{quote(media_path)}"
+    video = media_index.get(directory or ROOT_KEY)
+    if video is not None and video.filename == filename:
+        url += f"?v={video.version}"
+    return url
+
+
+def _build_victory_boards() -> tuple[bytes, dict[str, list], dict[str, dict[int, int]]]:
+    """Общая часть экрана победы и места участников — из одного снимка базы.
+
+    Возвращает JSON VictoryBoards, строки рейтингов игроков по типу игры и
+    индекс registration_id -> позиция в этих строках.
+    """
+    snapshot = db.get_victory_boards(GAME_TYPES)
+    players = snapshot["players"]
+    shared = VictoryBoards(
+        team_totals=[_team_total_entry(row) for row in snapshot["team_totals"]],
+        boards=[
+            VictoryBoard(
+                game_type=game_type,
+                players=[_stats_entry(row) for row in players[game_type]],
+                teams=[_team_stats_entry(row) for row in snapshot["teams"][game_type]],
+            )
+            for game_type in GAME_TYPES
+        ],
+    )
+    positions = {
+        game_type: {int(row["registration_id"]): index for index, row in enumerate(rows)}
+        for game_type, rows in players.items()
+    }
+    return shared.model_dump_json().encode(), players, positions
+
+
+def _build_victory_placement(
+    registration_id: int | None, game_type: str, players: list, positions: dict[int, int]
+) -> bytes:
+    congrats = media_index.get(ROOT_KEY)
+    placement: dict = {
+        "game_type": game_type,
+        "congrats_url": _media_url(congrats.filename) if congrats else None,
+    }
+    registration = db.get_registration_video(registration_id) if registration_id else None
+    if registration is not None:
+        index = positions.get(registration_id)
+        if index is not None:
+            placement["rank"] = index + 1
+            placement["player"] = _stats_entry(players[index], index + 1)
+        if registration["media_path"]:
+            placement["team_video_url"] = _media_url(registration["media_path"])
+    return VictoryPlacement(**placement).model_dump_json().encode()
+
+
+@app.get("/api/victory", response_model=VictoryResponse)
+async def get_victory(
+    game_type: str = Query(default="memo"),
+    registration_id: int | None = Query(default=None, gt=0),
+    cache_headers: dict = conditional_get(*LEADERBOARD_TABLES, "registrations", "media"),
+) -> Response:
+    """Экран победы одним запросом.
+
+    Рейтинги всех игр и командный зачёт читаются одной транзакцией и
+    кэшируются вместе с индексом мест, поэтому место участника всегда
+    совпадает с его позицией в возвращённом рейтинге. На каждый запрос
+    читаются только команда участника и ссылки на видео. Неизвестный
+    registration_id не ошибка: ответ — общие рейтинги с пустыми rank,
+    player и team_video_url.
+    """
+    if game_type not in GAME_TYPES:
+        raise HTTPException(status_code=400, detail="Недопустимый тип игры")
+    cached, generation = leaderboard_cache.lookup(("victory",))
+    if cached is None:
+        cached = await adb.run_read(_build_victory_boards)
+        leaderboard_cache.store(("victory",), cached, generation)
+    shared, players, positions = cached
+    placement = await adb.run_read(
+        _build_victory_placement,
+        registration_id,
+        game_type,
+        players[game_type],
+        positions[game_type],
+    )
+    # Склейка JSON-объектов: поля VictoryPlacement, затем поля VictoryBoards.
+    return _json_response(placement[:-1] + b"," + shared[1:], cache_headers)
+
+
+@app.get("/api/live/leaderboard")
+async def live_leaderboard_stream() -> StreamingResponse:
+    """Поток SSE: сначала `snapshot`, затем `diff` после каждого изменения результатов."""
+    return StreamingResponse(
+        live_leaderboard.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get(
+    "/api/teams",
+    response_model=TeamListResponse,
+    dependencies=[conditional_get("teams")],
+)
+async def get_teams() -> TeamListResponse:
     entries = [
         {
             "team": row["team"],
             "media_path": row["media_path"],
         }
-        for row in db.get_teams()
+        for row in await adb.get_teams()
     ]
     return TeamListResponse(entries=entries)
 
 
 @app.post("/api/admin/verify")
-def admin_verify(payload: AdminVerifyIn) -> dict:
+async def admin_verify(payload: AdminVerifyIn) -> dict:
     if payload.password != ADMIN_PASSWORD:
         raise HTTPException(status_code=401, detail="Неверный пароль")
     return {"ok": True}
 
 
 @app.get("/api/admin/teams", response_model=TeamListResponse)
-def get_admin_teams(_: None = Depends(verify_admin)) -> TeamListResponse:
+async def get_admin_teams(_: None = Depends(verify_admin)) -> TeamListResponse:
     entries = [
         {
             "team": row["team"],
             "media_path": row["media_path"],
         }
-        for row in db.get_teams()
+        for row in await adb.get_teams()
     ]
     return TeamListResponse(entries=entries)
 
 
 @app.put("/api/admin/teams/{team_key}", response_model=TeamEntry)
-def update_admin_team(
+async def update_admin_team(
     team_key: str, payload: TeamEntry, _: None = Depends(verify_admin)
 ) -> TeamEntry:
     if "/" in payload.team or "\\" in payload.team:
         raise HTTPException(status_code=400, detail="Некорректное имя команды")
     try:
-        updated = db.update_team(team_key, payload.team, payload.media_path)
+        updated = await adb.update_team(team_key, payload.team, payload.media_path)
     except ValueError:
         raise HTTPException(status_code=409, detail="Команда уже существует")
     if not updated:
@@ -239,34 +697,122 @@ def update_admin_team(
 
 
 @app.delete("/api/admin/teams/{team_key}")
-def delete_admin_team(team_key: str, _: None = Depends(verify_admin)) -> dict:
-    deleted = db.delete_team(team_key)
+async def delete_admin_team(team_key: str, _: None = Depends(verify_admin)) -> dict:
+    deleted = await adb.delete_team(team_key)
     if not deleted:
         raise HTTPException(status_code=404, detail="Команда не найдена")
     return {"status": "deleted"}
 
 
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+REGISTRATION_IMPORT_LIMIT = 50000
+
+
+@app.post("/api/admin/registrations/import", response_model=RegistrationImportOut)
+async def import_admin_registrations(
+    request: Request, _: None = Depends(verify_admin)
+) -> RegistrationImportOut:
+    """Предварительная регистрация списком: CSV с колонками fio, team, email.
+
+    Файл принимается целиком или не принимается вовсе; недостающие команды
+    создаются. В ответе — id регистрации для каждой строки файла.
+    """
+    rows: list[tuple[str, str, str | None]] = []
+    try:
+        async for record in bulk_io.iter_csv_records(request.stream()):
+            if len(rows) >= REGISTRATION_IMPORT_LIMIT:
+                raise HTTPException(status_code=413, detail="Слишком много строк в файле")
+            record = {key: value.strip() for key, value in record.items() if value and value.strip()}
+            try:
+                item = RegistrationIn.model_validate(record)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Некорректная строка №{len(rows) + 1}: {e.errors()[0]['msg']}",
+                )
+            rows.append((item.fio, item.team, item.email))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Не удалось разобрать файл")
+    if not rows:
+        raise HTTPException(status_code=400, detail="В файле нет участников")
+
+    ids, created_teams = await adb.import_registrations(rows)
+    return RegistrationImportOut(
+        registrations=[
+            RegistrationImportRow(row=row, id=reg_id) for row, reg_id in enumerate(ids, start=1)
+        ],
+        created_teams=created_teams,
+    )
+
+
+@app.get("/api/admin/export/results")
+async def export_results(
+    export_format: str = Query(default="csv", alias="format"),
+    team: str | None = Query(default=None),
+    game_type: str | None = Query(default=None),
+    _: None = Depends(verify_admin),
+) -> StreamingResponse:
+    """Все регистрации с результатами игр одним потоком (CSV или NDJSON)."""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Недопустимый формат выгрузки")
+    if game_type is not None and game_type not in GAME_TYPES:
+        raise HTTPException(status_code=400, detail="Недопустимый тип игры")
+    batches = adb.iterate_read(db.iter_results_export(team, game_type))
+    if export_format == "csv":
+        body = bulk_io.encode_csv(batches, db.EXPORT_FIELDS)
+    else:
+        body = bulk_io.encode_ndjson(batches)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="results.{export_format}"',
+        },
+    )
+
+
+@app.get("/api/admin/cache-stats")
+async def get_admin_cache_stats(_: None = Depends(verify_admin)) -> dict:
+    return {"leaderboards": leaderboard_cache.stats()}
+
+
+@app.get("/api/admin/metrics")
+async def get_admin_metrics(_: None = Depends(verify_admin)) -> Response:
+    """Метрики этого воркера в текстовом формате Prometheus."""
+    return Response(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.post("/api/admin/reset-results")
-def reset_admin_results(_: None = Depends(verify_admin)) -> dict:
-    deleted = db.reset_all_game_results()
+async def reset_admin_results(_: None = Depends(verify_admin)) -> dict:
+    deleted = await adb.reset_all_game_results()
     return {"status": "ok", "deleted_count": deleted}
 
 
 @app.get("/api/truth-or-myth", response_model=TruthOrMythResponse)
-def get_truth_or_myth_questions(
-    limit: int = Query(default=6, ge=1, le=20)
+async def get_truth_or_myth_questions(
+    limit: int = Query(default=6, ge=1, le=20),
+    seed: int | None = Query(default=None),
+    registration_id: int | None = Query(default=None, gt=0),
 ) -> TruthOrMythResponse:
-    entries = [
-        {
-            "id": row["id"],
-            "statement": row["statement"],
-            "is_true": bool(row["is_true"]),
-        }
-        for row in db.get_truth_or_myth_questions(limit)
-    ]
+    if question_pool.stale:
+        await adb.run_read(question_pool.refresh)
+    entries = question_pool.sample(limit, seed=seed, registration_id=registration_id)
     return TruthOrMythResponse(entries=entries)
-@app.get("/api/questions", response_model=TrueFalseQuestionList)
-def get_true_false_questions() -> TrueFalseQuestionList:
+
+
+@app.get(
+    "/api/questions",
+    response_model=TrueFalseQuestionList,
+    dependencies=[conditional_get("true_false_questions")],
+)
+async def get_true_false_questions() -> TrueFalseQuestionList:
     entries = [
         {
             "id": int(row["id"]),
@@ -274,13 +820,13 @@ def get_true_false_questions() -> TrueFalseQuestionList:
             "answer": bool(row["answer"]),
             "is_active": bool(row["is_active"]),
         }
-        for row in db.list_true_false_questions(include_inactive=False)
+        for row in await adb.list_true_false_questions(include_inactive=False)
     ]
     return TrueFalseQuestionList(entries=entries)
 
 
 @app.get("/api/admin/questions", response_model=TruthOrMythAdminList)
-def get_admin_truth_or_myth_questions(
+async def get_admin_truth_or_myth_questions(
     _: None = Depends(verify_admin),
 ) -> TruthOrMythAdminList:
     entries = [
@@ -290,16 +836,16 @@ def get_admin_truth_or_myth_questions(
             "is_true": bool(row["is_true"]),
             "is_active": bool(row["is_active"]),
         }
-        for row in db.list_truth_or_myth_questions(include_inactive=True)
+        for row in await adb.list_truth_or_myth_questions(include_inactive=True)
     ]
     return TruthOrMythAdminList(entries=entries)
 
 
 @app.post("/api/admin/questions", response_model=TruthOrMythAdminEntry)
-def create_admin_truth_or_myth_question(
+async def create_admin_truth_or_myth_question(
     payload: TruthOrMythAdminIn, _: None = Depends(verify_admin)
 ) -> TruthOrMythAdminEntry:
-    question_id = db.create_truth_or_myth_question(
+    question_id = await adb.create_truth_or_myth_question(
         payload.statement, payload.is_true, payload.is_active
     )
     return TruthOrMythAdminEntry(
@@ -310,13 +856,90 @@ def create_admin_truth_or_myth_question(
     )
 
 
+QUESTION_IMPORT_LIMIT = 20000
+QUESTION_FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def _read_question_import(request: Request, import_format: str) -> list[tuple]:
+    if import_format == "csv":
+        records = bulk_io.iter_csv_records(request.stream())
+    else:
+        records = bulk_io.iter_json_array(request.stream())
+    items: list[tuple] = []
+    try:
+        async for record in records:
+            if len(items) >= QUESTION_IMPORT_LIMIT:
+                raise HTTPException(status_code=413, detail="Слишком много вопросов в файле")
+            if import_format == "csv":
+                # Пустая ячейка — значение по умолчанию (для id — новый вопрос).
+                record = {key: value for key, value in record.items() if value and value.strip()}
+            try:
+                item = TruthOrMythImportItem.model_validate(record)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Некорректный вопрос №{len(items) + 1}: {e.errors()[0]['msg']}",
+                )
+            items.append((item.id or uuid4().hex, item.statement, item.is_true, item.is_active))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Не удалось разобрать файл")
+    return items
+
+
+@app.post("/api/admin/questions/import", response_model=TruthOrMythImportOut)
+async def import_admin_questions(
+    request: Request,
+    import_format: str = Query(default="json", alias="format"),
+    mode: str = Query(default="merge"),
+    _: None = Depends(verify_admin),
+) -> TruthOrMythImportOut:
+    """Массовый импорт: вопросы с известным id обновляются, остальные добавляются.
+
+    `mode=replace` заменяет весь банк: вопросы, которых нет в файле, удаляются.
+    """
+    if import_format not in QUESTION_FORMATS:
+        raise HTTPException(status_code=400, detail="Недопустимый формат файла")
+    if mode not in ("merge", "replace"):
+        raise HTTPException(status_code=400, detail="Недопустимый режим импорта")
+    items = await _read_question_import(request, import_format)
+    if not items:
+        raise HTTPException(status_code=400, detail="В файле нет вопросов")
+    summary = await adb.import_truth_or_myth_questions(items, replace=mode == "replace")
+    return TruthOrMythImportOut(**summary)
+
+
+@app.get("/api/admin/questions/export")
+async def export_admin_questions(
+    export_format: str = Query(default="json", alias="format"),
+    _: None = Depends(verify_admin),
+) -> StreamingResponse:
+    """Весь банк вопросов в формате, который принимает импорт."""
+    if export_format not in QUESTION_FORMATS:
+        raise HTTPException(status_code=400, detail="Недопустимый формат файла")
+    batches = adb.iterate_read(db.iter_truth_or_myth_questions())
+    if export_format == "csv":
+        body = bulk_io.encode_csv(batches, db.QUESTION_EXPORT_FIELDS)
+    else:
+        body = bulk_io.encode_json_array(batches)
+    return StreamingResponse(
+        body,
+        media_type=QUESTION_FORMATS[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="questions.{export_format}"',
+        },
+    )
+
+
 @app.put("/api/admin/questions/{question_id}", response_model=TruthOrMythAdminEntry)
-def update_admin_truth_or_myth_question(
+async def update_admin_truth_or_myth_question(
     question_id: str,
     payload: TruthOrMythAdminIn,
     _: None = Depends(verify_admin),
 ) -> TruthOrMythAdminEntry:
-    updated = db.update_truth_or_myth_question(
+    updated = await adb.update_truth_or_myth_question(
         question_id, payload.statement, payload.is_true, payload.is_active
     )
     if not updated:
@@ -330,23 +953,22 @@ def update_admin_truth_or_myth_question(
 
 
 @app.delete("/api/admin/questions/{question_id}")
-def delete_admin_truth_or_myth_question(
+async def delete_admin_truth_or_myth_question(
     question_id: str, _: None = Depends(verify_admin)
 ) -> dict:
-    deleted = db.delete_truth_or_myth_question(question_id)
+    deleted = await adb.delete_truth_or_myth_question(question_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Вопрос не найден")
     return {"status": "deleted"}
 
 
 @app.get("/api/admin/videos", response_model=VideoListResponse)
-def get_admin_videos(_: None = Depends(verify_admin)) -> VideoListResponse:
+async def get_admin_videos(_: None = Depends(verify_admin)) -> VideoListResponse:
+    rows = await adb.get_teams()
     entries: list[VideoEntry] = []
-    entries.append(_build_video_entry(DEFAULT_TEAM_KEY, MEDIA_DIR, True))
-    for row in db.get_teams():
-        team_key = row["team"]
-        team_dir = _team_directory(team_key)
-        entries.append(_build_video_entry(team_key, team_dir, False))
+    entries.append(_build_video_entry(DEFAULT_TEAM_KEY, True))
+    for row in rows:
+        entries.append(_build_video_entry(row["team"], False))
 
     return VideoListResponse(entries=entries)
 
@@ -358,28 +980,126 @@ async def upload_admin_video(
     _: None = Depends(verify_admin),
 ) -> VideoEntry:
     team_dir = _team_directory(team_key)
-    team_dir.mkdir(parents=True, exist_ok=True)
+    target_name = _video_target_name(file.filename)
+
+    try:
+        await save_upload(
+            file,
+            team_dir / target_name,
+            max_bytes=MAX_VIDEO_UPLOAD_BYTES,
+            replaces=TEAM_VIDEO_BASENAME,
+            compute_hash=False,
+        )
+    except ValueError:
+        raise HTTPException(status_code=413, detail="Файл слишком большой")
+    return await _publish_team_video(team_key, target_name)
+
 
-    extension = Path(file.filename or "").suffix.lower()
+def _video_target_name(filename: str | None) -> str:
+    extension = Path(filename or "").suffix.lower()
     if not extension:
         extension = ".mp4"
-    target_name = f"{TEAM_VIDEO_BASENAME}{extension}"
+    return f"{TEAM_VIDEO_BASENAME}{extension}"
 
-    for existing in team_dir.glob(f"{TEAM_VIDEO_BASENAME}.*"):
-        if existing.is_file():
-            existing.unlink()
 
-    target_path = team_dir / target_name
-    try:
-        with target_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    finally:
-        await file.close()
+async def _publish_team_video(team_key: str, target_name: str) -> VideoEntry:
+    media_index.refresh_team(_media_key(team_key))
 
     if team_key != DEFAULT_TEAM_KEY:
         media_path = f"{team_key}/{target_name}"
-        db.upsert_team(team_key, media_path)
+        await adb.upsert_team(team_key, media_path)
+    await adb.run_write(db.mark_changed, "media")
+
+    return _build_video_entry(team_key, is_default=team_key == DEFAULT_TEAM_KEY)
+
+
+_UPLOAD_ERRORS = {
+    "not_found": (404, "Загрузка не найдена"),
+    "too_large": (413, "Файл слишком большой"),
+    "bad_offset": (409, "Смещение куска не совпадает с уже принятыми данными"),
+    "incomplete": (409, "Получены не все куски"),
+}
+
+
+def _upload_error(error: ValueError) -> HTTPException:
+    status_code, detail = _UPLOAD_ERRORS.get(str(error), (400, "Некорректная загрузка"))
+    return HTTPException(status_code=status_code, detail=detail)
 
-    return _build_video_entry(
-        team_key, team_dir, is_default=team_key == DEFAULT_TEAM_KEY
+
+def _upload_status(session: UploadSession) -> VideoUploadStatus:
+    return VideoUploadStatus(
+        upload_id=session.upload_id,
+        team_key=session.team_key,
+        received_bytes=session.received_bytes,
+        parts=[
+            VideoUploadPart(number=part.number, offset=part.offset, size=part.size)
+            for part in session.parts
+        ],
     )
+
+
+@app.post("/api/admin/videos/{team_key}/uploads", response_model=VideoUploadStatus)
+async def create_video_upload(
+    team_key: str,
+    payload: VideoUploadIn,
+    _: None = Depends(verify_admin),
+) -> VideoUploadStatus:
+    """Начинает докачиваемую загрузку: дальше куски идут PUT-ами, затем complete."""
+    _team_directory(team_key)
+    extension = Path(_video_target_name(payload.filename)).suffix
+    session = await run_in_threadpool(upload_sessions.create, team_key, extension)
+    return _upload_status(session)
+
+
+@app.get("/api/admin/uploads/{upload_id}", response_model=VideoUploadStatus)
+async def get_video_upload(
+    upload_id: str, _: None = Depends(verify_admin)
+) -> VideoUploadStatus:
+    """Принятые куски — по ним клиент после обрыва продолжает с нужного места."""
+    try:
+        session = await run_in_threadpool(upload_sessions.status, upload_id)
+    except ValueError as e:
+        raise _upload_error(e)
+    return _upload_status(session)
+
+
+@app.put("/api/admin/uploads/{upload_id}/parts/{number}", response_model=VideoUploadPart)
+async def put_video_upload_part(
+    upload_id: str,
+    number: int,
+    request: Request,
+    offset: int = Query(ge=0),
+    _: None = Depends(verify_admin),
+) -> VideoUploadPart:
+    """Тело запроса — сырые байты куска, `offset` — его смещение в файле."""
+    try:
+        part = await upload_sessions.write_part(upload_id, number, offset, request.stream())
+    except ValueError as e:
+        raise _upload_error(e)
+    return VideoUploadPart(number=part.number, offset=part.offset, size=part.size)
+
+
+@app.post("/api/admin/uploads/{upload_id}/complete", response_model=VideoEntry)
+async def complete_video_upload(
+    upload_id: str, _: None = Depends(verify_admin)
+) -> VideoEntry:
+    try:
+        session = await run_in_threadpool(upload_sessions.status, upload_id)
+        target_name = f"{TEAM_VIDEO_BASENAME}{session.extension}"
+        await upload_sessions.assemble(
+            upload_id,
+            _team_directory(session.team_key) / target_name,
+            replaces=TEAM_VIDEO_BASENAME,
+        )
+    except ValueError as e:
+        raise _upload_error(e)
+    return await _publish_team_video(session.team_key, target_name)
+
+
+@app.delete("/api/admin/uploads/{upload_id}")
+async def delete_video_upload(upload_id: str, _: None = Depends(verify_admin)) -> dict:
+    try:
+        await run_in_threadpool(upload_sessions.discard, upload_id)
+    except ValueError as e:
+        raise _upload_error(e)
+    return {"status": "deleted"}
@@ -0,0 +1,84 @@
+"""Раздача видео из media: диапазоны, кэширование и облегчённые версии."""
+import os
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from media_index import ROOT_KEY, MediaFile, MediaIndex
+
+# URL с актуальной меткой ?v= не меняется, пока файл тот же.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Без метки (или со старой) клиент перепроверяет файл по ETag.
+REVALIDATE_CACHE_CONTROL = "no-cache"
+LOW_RENDITION = "low"
+
+
+class MediaFileResponse(FileResponse):
+    """FileResponse с крупными кусками: видео на сотни МБ уходит меньшим числом send."""
+
+    chunk_size = 1024 * 1024
+
+
+class MediaFiles(StaticFiles):
+    """StaticFiles для каталога media с учётом индекса видео.
+
+    Для видео из индекса выставляет Cache-Control: immutable, если в URL
+    актуальная метка `?v=`, и no-cache (перепроверка по ETag) иначе. Отдаёт
+    облегчённую версию при `?rendition=low` или заголовке `Save-Data: on`.
+    """
+
+    def __init__(self, *, directory: os.PathLike | str, index: MediaIndex) -> None:
+        super().__init__(directory=directory)
+        self._index = index
+
+    def _lookup(self, path: str) -> tuple[str, MediaFile] | None:
+        directory, _, filename = path.replace("\\", "/").rpartition("/")
+        if "/" in directory:
+            return None
+        video = self._index.get(directory or ROOT_KEY)
+        if video is None or video.filename != filename:
+            return None
+        return directory, video
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        # Скрытые файлы и каталоги (недокачанные загрузки, .part) не раздаём.
+        if any(part.startswith(".") for part in path.replace("\\", "/").split("/")):
+            raise HTTPException(status_code=404)
+        found = self._lookup(path)
+        if found is None:
+            return await super().get_response(path, scope)
+        directory, video = found
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        headers = Headers(scope=scope)
+        wants_low = (
+            query.get("rendition", [""])[0] == LOW_RENDITION
+            or headers.get("save-data", "").lower() == "on"
+        )
+        if wants_low and video.low is not None:
+            path = os.path.join(directory, video.low.filename)
+
+        response = await super().get_response(path, scope)
+        if query.get("v", [""])[0] == video.version:
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+        if video.low is not None:
+            response.headers.add_vary_header("Save-Data")
+        return response
+
+    def file_response(
+        self,
+        full_path: os.PathLike | str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        response = MediaFileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
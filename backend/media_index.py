@@ -0,0 +1,160 @@
+"""Индекс видео поздравлений в каталоге media."""
+from collections.abc import Callable
+from dataclasses import dataclass
+import hashlib
+import logging
+import os
+from pathlib import Path
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Ключ корня media: там лежит общее поздравление.
+ROOT_KEY = ""
+# Облегчённая версия видео: congrats-low.mp4 рядом с congrats.mp4.
+LOW_RENDITION_SUFFIX = "-low"
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    filename: str
+    size: int
+    mtime_ns: int
+    low: "MediaFile | None" = None
+
+    @property
+    def version(self) -> str:
+        """Метка содержимого для URL: меняется при каждой замене файла."""
+        parts = [self.filename, self.size, self.mtime_ns]
+        if self.low is not None:
+            parts += [self.low.filename, self.low.size, self.low.mtime_ns]
+        return hashlib.blake2s(repr(parts).encode(), digest_size=8).hexdigest()
+
+
+def _find_file(directory: str, basename: str) -> MediaFile | None:
+    prefix = f"{basename}."
+    best: os.DirEntry | None = None
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix) or not entry.is_file():
+                    continue
+                if best is None or entry.name < best.name:
+                    best = entry
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if best is None:
+        return None
+    stat = best.stat()
+    return MediaFile(best.name, stat.st_size, stat.st_mtime_ns)
+
+
+def _find_video(directory: str, basename: str) -> MediaFile | None:
+    video = _find_file(directory, basename)
+    if video is None:
+        return None
+    low = _find_file(directory, f"{basename}{LOW_RENDITION_SUFFIX}")
+    # Облегчённая версия старше основного файла — осталась от прошлого видео.
+    if low is None or low.mtime_ns < video.mtime_ns:
+        return video
+    return MediaFile(video.filename, video.size, video.mtime_ns, low)
+
+
+def scan_media(root: Path, basename: str) -> dict[str, MediaFile | None]:
+    """Один проход по media: ключ — имя каталога команды (ROOT_KEY для корня)."""
+    videos: dict[str, MediaFile | None] = {ROOT_KEY: _find_video(str(root), basename)}
+    try:
+        with os.scandir(root) as entries:
+            team_dirs = [
+                entry for entry in entries
+                if entry.is_dir() and not entry.name.startswith(".")
+            ]
+    except FileNotFoundError:
+        return videos
+    for entry in team_dirs:
+        videos[entry.name] = _find_video(entry.path, basename)
+    return videos
+
+
+def media_stamp(root: Path) -> str:
+    """Дешёвый отпечаток состава media: mtime корня и каталогов команд.
+
+    Меняется, когда в каталоге появляется, пропадает или подменяется файл
+    (загрузка пишет через os.replace), но не при перезаписи файла на месте.
+    """
+    parts: list[tuple[str, int]] = []
+    try:
+        parts.append((ROOT_KEY, root.stat().st_mtime_ns))
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir() and not entry.name.startswith("."):
+                    parts.append((entry.name, entry.stat().st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    parts.sort()
+    return hashlib.blake2s(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class MediaIndex:
+    """Команда → файл видео (имя, размер, mtime), без обращений к диску на чтении.
+
+    Строится один раз, точечно обновляется после загрузки видео и, если
+    включено, периодически сверяется с диском фоновым потоком.
+    """
+
+    def __init__(self, root: Path, basename: str) -> None:
+        self._root = root
+        self._basename = basename
+        self._videos: dict[str, MediaFile | None] = {}
+        self._lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def rebuild(self) -> bool:
+        """Пересканирует media; возвращает True, если что-то изменилось."""
+        videos = scan_media(self._root, self._basename)
+        with self._lock:
+            changed = videos != self._videos
+            self._videos = videos
+        return changed
+
+    def refresh_team(self, key: str) -> None:
+        directory = self._root / key if key != ROOT_KEY else self._root
+        video = _find_video(str(directory), self._basename)
+        with self._lock:
+            videos = dict(self._videos)
+            videos[key] = video
+            self._videos = videos
+
+    def get(self, key: str) -> MediaFile | None:
+        return self._videos.get(key)
+
+    def team_videos(self) -> dict[str, str | None]:
+        """Каталоги команд и имена их видео (для заполнения таблицы teams)."""
+        return {
+            key: video.filename if video else None
+            for key, video in self._videos.items()
+            if key != ROOT_KEY
+        }
+
+    def start_watcher(self, interval: float, on_change: Callable[[], None]) -> None:
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def watch() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    if self.rebuild():
+                        on_change()
+                except Exception:
+                    logger.exception("Не удалось пересканировать media")
+
+        self._watcher = threading.Thread(target=watch, name="media-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,218 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+Запись — счётчик под коротким замком, без аллокаций на горячем пути;
+текст собирается только при запросе /api/admin/metrics. Метрики свои у
+каждого воркера.
+"""
+from abc import ABC, abstractmethod
+import bisect
+from collections.abc import Callable, Iterator
+import threading
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Границы корзин гистограмм длительности, секунды.
+DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Строки значений метрики в текстовом формате Prometheus."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackMetric(_Metric):
+    """Значение снимается вызовом `read()` в момент сбора метрик."""
+
+    def __init__(
+        self, name: str, help_text: str, read: Callable[[], float], kind: str = "gauge"
+    ) -> None:
+        super().__init__(name, help_text)
+        self.kind = kind
+        self._read = read
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_format_value(self._read())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._buckets = buckets
+        # Метки → [счётчики по корзинам (+Inf последним), сумма].
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self._buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = {
+                labels: (list(counts), total) for labels, (counts, total) in self._series.items()
+            }
+        for labels, (counts, total) in series.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield (
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса до отправки последнего байта ответа.",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Запросы, обрабатываемые сейчас.", ("method",)
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds",
+    "Время вызова функции db, включая ожидание соединения из пула.",
+    ("function",),
+))
+DB_QUERY_ROWS = REGISTRY.register(Counter(
+    "db_query_rows_total", "Строки, возвращённые функциями db.", ("function",)
+))
+DB_CONNECTIONS_OPENED = REGISTRY.register(Counter(
+    "db_connections_opened_total", "Открытые соединения SQLite за время работы процесса."
+))
+DB_CONNECTIONS_IN_USE = REGISTRY.register(Gauge(
+    "db_pool_connections_in_use", "Соединения, выданные из пула сейчас."
+))
+
+
+def _route_label(scope: Scope, root_path: str) -> str:
+    route = scope.get("route")
+    # Шаблон маршрута, а не путь: /api/admin/uploads/{upload_id}, а не каждый id.
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # Смонтированное приложение (/media) маршрут не выставляет, но сдвигает root_path.
+    mount = scope.get("root_path", "")[len(root_path):]
+    return f"{mount}/{{path}}" if mount else "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: гистограмма длительности по маршрутам и число активных запросов."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method, _route_label(scope, root_path), str(status)
+            )
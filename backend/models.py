@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel, Field
 
 
@@ -17,6 +19,16 @@ class RegistrationOut(BaseModel):
     team: str
 
 
+class RegistrationImportRow(BaseModel):
+    row: int  # номер строки данных в файле, с 1
+    id: int
+
+
+class RegistrationImportOut(BaseModel):
+    registrations: list[RegistrationImportRow]
+    created_teams: list[str]
+
+
 class GameResultIn(BaseModel):
     registration_id: int = Field(gt=0)
     game_type: str = "memo"
@@ -28,6 +40,30 @@ class GameResultOut(BaseModel):
     registration_id: int
     game_type: str
     moves: int
+    rank: int | None = None
+    total_players: int
+    percentile: float | None = None  # доля игроков с тем же или худшим местом, %
+    team_position: int | None = None
+
+
+class GameResultBatchItem(GameResultIn):
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=100)
+
+
+class GameResultBatchIn(BaseModel):
+    # Элементы проверяются по одному, чтобы ошибка в одном не отклоняла весь пакет.
+    items: list[Any] = Field(min_length=1, max_length=1000)
+
+
+class GameResultBatchStatus(BaseModel):
+    index: int
+    status: str  # created / already_played / invalid
+    id: int | None = None
+    error: str | None = None
+
+
+class GameResultBatchOut(BaseModel):
+    results: list[GameResultBatchStatus]
 
 
 class StatsEntry(BaseModel):
@@ -37,10 +73,13 @@ class StatsEntry(BaseModel):
     games_count: int
     best_moves: int
     last_played: str
+    rank: int | None = None
 
 
 class StatsResponse(BaseModel):
     entries: list[StatsEntry]
+    next_cursor: str | None = None
+    rank: int | None = None
 
 
 class TeamStatsEntry(BaseModel):
@@ -67,6 +106,29 @@ class TeamTotalStatsResponse(BaseModel):
     entries: list[TeamTotalEntry]
 
 
+class VictoryBoard(BaseModel):
+    game_type: str
+    players: list[StatsEntry]
+    teams: list[TeamStatsEntry]
+
+
+class VictoryPlacement(BaseModel):
+    game_type: str
+    rank: int | None = None
+    player: StatsEntry | None = None
+    congrats_url: str | None = None
+    team_video_url: str | None = None
+
+
+class VictoryBoards(BaseModel):
+    team_totals: list[TeamTotalEntry]
+    boards: list[VictoryBoard]
+
+
+class VictoryResponse(VictoryPlacement, VictoryBoards):
+    pass
+
+
 class TeamEntry(BaseModel):
     team: str = Field(min_length=1, max_length=100)
     media_path: str = Field(min_length=1, max_length=300)
@@ -86,6 +148,23 @@ class VideoListResponse(BaseModel):
     entries: list[VideoEntry]
 
 
+class VideoUploadIn(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+
+
+class VideoUploadPart(BaseModel):
+    number: int
+    offset: int
+    size: int
+
+
+class VideoUploadStatus(BaseModel):
+    upload_id: str
+    team_key: str
+    received_bytes: int
+    parts: list[VideoUploadPart]
+
+
 class TruthOrMythEntry(BaseModel):
     id: str
     statement: str
@@ -113,6 +192,17 @@ class TruthOrMythAdminList(BaseModel):
     entries: list[TruthOrMythAdminEntry]
 
 
+class TruthOrMythImportItem(TruthOrMythAdminIn):
+    id: str | None = Field(default=None, min_length=1, max_length=100)
+
+
+class TruthOrMythImportOut(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    deleted: int
+
+
 class TrueFalseQuestionIn(BaseModel):
     question: str = Field(min_length=1, max_length=500)
     answer: bool
@@ -0,0 +1,90 @@
+"""Пул вопросов «Правда или миф» в памяти процесса."""
+from collections import OrderedDict
+from collections.abc import Callable
+import random
+import threading
+
+# Сколько участников помнить, чтобы не повторять им уже показанные вопросы.
+MAX_TRACKED_REGISTRATIONS = 10_000
+
+
+class QuestionPool:
+    """Активные вопросы, загруженные из базы один раз и обновляемые по изменению.
+
+    `invalidate()` вызывается после изменения вопросов в админке, перезагрузка
+    происходит перед следующей выборкой. Выборка стоит O(limit), а не
+    полного прохода по таблице.
+    """
+
+    def __init__(self, load: Callable[[], list]) -> None:
+        self._load = load
+        self._questions: list[dict] = []
+        self._stale = True
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._seen: OrderedDict[int, set[str]] = OrderedDict()
+
+    @property
+    def stale(self) -> bool:
+        return self._stale
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def refresh(self) -> None:
+        # Флаг снимается до загрузки: invalidate() во время неё не потеряется.
+        self._stale = False
+        try:
+            questions = [
+                {"id": row["id"], "statement": row["statement"], "is_true": bool(row["is_true"])}
+                for row in self._load()
+            ]
+        except BaseException:
+            self._stale = True
+            raise
+        with self._lock:
+            self._questions = questions
+
+    def sample(
+        self,
+        limit: int,
+        seed: int | None = None,
+        registration_id: int | None = None,
+    ) -> list[dict]:
+        """Случайные `limit` вопросов; с `registration_id` — сначала ещё не показанные."""
+        rng = random.Random(seed) if seed is not None else self._rng
+        with self._lock:
+            questions = self._questions
+            if registration_id is None:
+                return rng.sample(questions, min(limit, len(questions)))
+            seen = self._seen.pop(registration_id, set())
+            picked = _sample_excluding(questions, limit, rng, seen)
+            if len(picked) < limit:
+                # Новые вопросы кончились — начинаем круг заново.
+                seen = set()
+                taken = {question["id"] for question in picked}
+                picked += _sample_excluding(questions, limit - len(picked), rng, taken)
+            seen.update(question["id"] for question in picked)
+            self._seen[registration_id] = seen
+            while len(self._seen) > MAX_TRACKED_REGISTRATIONS:
+                self._seen.popitem(last=False)
+            return picked
+
+
+def _sample_excluding(
+    questions: list[dict], limit: int, rng: random.Random, exclude: set[str]
+) -> list[dict]:
+    if len(exclude) * 2 > len(questions):
+        candidates = [question for question in questions if question["id"] not in exclude]
+        return rng.sample(candidates, min(limit, len(candidates)))
+    # Исключённых меньше половины: случайные пробы укладываются в O(limit).
+    picked: list[dict] = []
+    tried: set[int] = set()
+    while len(picked) < limit and len(tried) < len(questions):
+        index = rng.randrange(len(questions))
+        if index in tried:
+            continue
+        tried.add(index)
+        if questions[index]["id"] not in exclude:
+            picked.append(questions[index])
+    return picked
@@ -0,0 +1,270 @@
+"""Схема базы: версионные миграции и индексы.
+
+Миграции применяются один раз при старте, номер последней записывается в
+schema_version. Индексы создаются при каждом запуске, в том числе на
+свежей базе.
+"""
+from collections.abc import Callable
+import sqlite3
+
+RESULTS_UNIQUE_INDEX = "ix_game_results_reg_game"
+
+INDEXES = {
+    # Одна попытка на игру для каждого участника.
+    RESULTS_UNIQUE_INDEX: """
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_game_results_reg_game
+        ON game_results(registration_id, game_type);
+    """,
+    # Повторная отправка пакета с киоска не создаёт дублей.
+    "ix_game_results_idempotency": """
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_game_results_idempotency
+        ON game_results(idempotency_key) WHERE idempotency_key IS NOT NULL;
+    """,
+    # Группировка участников по командам.
+    "ix_registrations_team": """
+        CREATE INDEX IF NOT EXISTS ix_registrations_team
+        ON registrations(team, id);
+    """,
+    # Агрегаты рейтингов в порядке выдачи.
+    "ix_player_game_stats_rank": """
+        CREATE INDEX IF NOT EXISTS ix_player_game_stats_rank
+        ON player_game_stats(game_type, best_moves, games_count DESC, last_played DESC);
+    """,
+    "ix_team_game_stats_rank": """
+        CREATE INDEX IF NOT EXISTS ix_team_game_stats_rank
+        ON team_game_stats(
+            game_type, best_moves, games_count DESC, last_played DESC, team COLLATE NOCASE
+        );
+    """,
+    "ix_team_total_stats_rank": """
+        CREATE INDEX IF NOT EXISTS ix_team_total_stats_rank
+        ON team_total_stats(games_played DESC, total_score, team COLLATE NOCASE);
+    """,
+}
+
+
+def _index_exists(conn: sqlite3.Connection, name: str) -> bool:
+    cursor = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?;", (name,)
+    )
+    return cursor.fetchone() is not None
+
+
+def _dedupe_game_results(conn: sqlite3.Connection) -> None:
+    # Keep the earliest result per registration and game before the unique index
+    conn.execute(
+        """
+        DELETE FROM game_results
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM game_results GROUP BY registration_id, game_type
+        );
+        """
+    )
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    if not _index_exists(conn, RESULTS_UNIQUE_INDEX):
+        _dedupe_game_results(conn)
+    for statement in INDEXES.values():
+        conn.execute(statement)
+
+
+def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    cursor = conn.execute(f"PRAGMA table_info({table});")
+    return any(row["name"] == column for row in cursor.fetchall())
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    # Базы, созданные до миграций, могли уже получить колонку.
+    if not _has_column(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS registrations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fio TEXT NOT NULL,
+            team TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS game_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            registration_id INTEGER NOT NULL,
+            moves INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+    _add_column(conn, "game_results", "game_type", "TEXT NOT NULL DEFAULT 'memo'")
+    _add_column(conn, "game_results", "idempotency_key", "TEXT")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS teams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            team TEXT NOT NULL UNIQUE,
+            media_path TEXT NOT NULL DEFAULT '',
+            sort_order INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS truth_or_myth_questions (
+            id TEXT PRIMARY KEY,
+            statement TEXT NOT NULL,
+            is_true INTEGER NOT NULL
+        );
+        """
+    )
+    _add_column(conn, "truth_or_myth_questions", "is_active", "INTEGER NOT NULL DEFAULT 1")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS true_false_questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer INTEGER NOT NULL,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+
+
+def _create_leaderboard_tables(conn: sqlite3.Connection) -> None:
+    """Агрегаты рейтингов: обновляются в одной транзакции с записью результата."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS player_game_stats (
+            registration_id INTEGER NOT NULL,
+            game_type TEXT NOT NULL,
+            games_count INTEGER NOT NULL,
+            best_moves INTEGER NOT NULL,
+            last_played TEXT NOT NULL,
+            PRIMARY KEY (registration_id, game_type)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS team_game_stats (
+            team TEXT NOT NULL,
+            game_type TEXT NOT NULL,
+            games_count INTEGER NOT NULL,
+            best_moves INTEGER NOT NULL,
+            last_played TEXT NOT NULL,
+            PRIMARY KEY (team, game_type)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS team_total_stats (
+            team TEXT PRIMARY KEY,
+            games_played INTEGER NOT NULL,
+            total_score INTEGER NOT NULL,
+            memo_best INTEGER,
+            truth_or_myth_best INTEGER,
+            reaction_best INTEGER
+        );
+        """
+    )
+
+
+def _add_registration_email(conn: sqlite3.Connection) -> None:
+    _add_column(conn, "registrations", "email", "TEXT NOT NULL DEFAULT ''")
+
+
+def _create_startup_state(conn: sqlite3.Connection) -> None:
+    # Отпечатки, по которым запуск решает, что можно не пересчитывать.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS startup_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        """
+    )
+
+
+def _create_change_versions(conn: sqlite3.Connection) -> None:
+    # Счётчики изменений по таблицам: по ним воркеры сбрасывают свои кэши.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        """
+    )
+
+
+def _drop_results_type_index(conn: sqlite3.Connection) -> None:
+    # Рейтинги читают агрегаты, индекс только замедлял вставку результатов.
+    conn.execute("DROP INDEX IF EXISTS ix_game_results_type_reg;")
+
+
+def _create_game_player_counts(conn: sqlite3.Connection) -> None:
+    # Число игроков в рейтинге каждой игры, чтобы не считать COUNT(*) на каждый результат.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS game_player_counts (
+            game_type TEXT PRIMARY KEY,
+            players INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO game_player_counts (game_type, players)
+        SELECT game_type, COUNT(*) FROM player_game_stats GROUP BY game_type;
+        """
+    )
+
+
+# Только дописываются в конец; номер применённой миграции не меняется.
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base_tables", _create_base_tables),
+    (2, "leaderboard_tables", _create_leaderboard_tables),
+    (3, "registration_email", _add_registration_email),
+    (4, "startup_state", _create_startup_state),
+    (5, "change_versions", _create_change_versions),
+    (6, "drop_results_type_index", _drop_results_type_index),
+    (7, "game_player_counts", _create_game_player_counts),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+    row = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version;").fetchone()
+    return int(row[0])
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции в текущей транзакции, возвращает версию схемы."""
+    version = current_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"schema version {version} is newer than this code ({SCHEMA_VERSION})")
+    for number, name, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        apply(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, name) VALUES (?, ?);", (number, name)
+        )
+    return SCHEMA_VERSION
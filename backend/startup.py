@@ -0,0 +1,52 @@
+"""Этапы запуска приложения: замер длительности и признак готовности."""
+from collections.abc import Awaitable, Callable
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class StartupPipeline:
+    """Этапы запуска с длительностями для /api/ready.
+
+    Обязательные этапы идут в lifespan до приёма запросов, прогрев — фоновой
+    задачей; после него вызывается `mark_ready()`. Ошибка этапа прогрева
+    записывается и не мешает готовности: без прогрева всё работает, только
+    первые запросы медленнее.
+    """
+
+    def __init__(self) -> None:
+        self.steps: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.full_init: bool | None = None
+        self._ready = False
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def mark_ready(self) -> None:
+        self._ready = True
+
+    async def step(self, name: str, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func(*args)
+        finally:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def warm(self, name: str, func: Callable[..., Awaitable[Any]], *args: Any) -> None:
+        try:
+            await self.step(name, func, *args)
+        except Exception as e:
+            logger.exception("Этап запуска %s не выполнен", name)
+            self.errors[name] = repr(e)
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self._ready else "starting",
+            "full_init": self.full_init,
+            "steps_ms": dict(self.steps),
+            "errors": dict(self.errors),
+        }
@@ -0,0 +1,66 @@
+import os
+import shutil
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import db  # noqa: E402
+
+GAME_TYPES = ("memo", "truth_or_myth", "reaction")
+
+# Замеры производительности идут минуты и зависят от машины: только по запросу.
+bench = pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="замер: запустите с RUN_BENCHMARKS=1"
+)
+
+
+def latency_report(label: str, seconds: list[float]) -> dict[str, float]:
+    """p50/p99/max в миллисекундах; печатается (видно с `pytest -s`)."""
+    cuts = statistics.quantiles(seconds, n=100, method="inclusive")
+    report = {
+        "p50": round(cuts[49] * 1000, 2),
+        "p99": round(cuts[98] * 1000, 2),
+        "max": round(max(seconds) * 1000, 2),
+    }
+    print(f"{label}: n={len(seconds)} " + " ".join(f"{k}={v}ms" for k, v in report.items()))
+    return report
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Пустая база во временном каталоге со своим пулом соединений."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "app.db")
+    monkeypatch.setattr(db, "_pool", db.ConnectionPool(db.DB_POOL_SIZE, db.DB_POOL_TIMEOUT))
+    monkeypatch.setattr(db, "_table_versions", {})
+    db.init_db(team_videos=dict, media_stamp="test")
+    yield db
+    db.close_pool()
+
+
+@pytest.fixture
+def results(database):
+    """Пять команд по двадцать участников, каждый сыграл во все игры."""
+    for team in range(5):
+        for player in range(20):
+            registration_id = db.create_registration(f"Игрок {team}-{player}", f"Команда {team}")
+            for offset, game_type in enumerate(GAME_TYPES):
+                db.create_game_result(registration_id, (player * 7 + offset) % 40 + 1, game_type)
+    return database
+
+
+@pytest.fixture
+def app(database):
+    """Приложение поверх временной базы; /media монтируется при импорте и должен существовать."""
+    media = BACKEND_DIR / "media"
+    created = not media.exists()
+    media.mkdir(exist_ok=True)
+    import main
+
+    yield main.app
+    if created:
+        shutil.rmtree(media)
@@ -0,0 +1,71 @@
+"""Замер: /api/health и чтение рейтинга во время всплеска записей (user-008)."""
+import asyncio
+import time
+
+import httpx
+
+import db
+from conftest import bench, latency_report
+
+pytestmark = bench
+
+WRITERS = 50
+BURST_SECONDS = 3.0
+
+
+async def _probe(client: httpx.AsyncClient, url: str, until: float) -> list[float]:
+    latencies = []
+    while time.monotonic() < until:
+        started = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def _write(client: httpx.AsyncClient, registration_ids: list[int], until: float) -> int:
+    written = 0
+    for registration_id in registration_ids:
+        if time.monotonic() >= until:
+            break
+        response = await client.post(
+            "/api/game-result",
+            json={"registration_id": registration_id, "moves": registration_id % 50 + 1},
+        )
+        assert response.status_code == 200
+        written += 1
+    return written
+
+
+def test_reads_stay_fast_during_write_burst(app):
+    import main
+
+    ids, _ = db.import_registrations(
+        [(f"Игрок {number}", f"Команда {number % 12}", None) for number in range(50_000)]
+    )
+
+    async def scenario() -> None:
+        async with main.lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                until = time.monotonic() + 1.0
+                idle_health, idle_read = await asyncio.gather(
+                    _probe(client, "/api/health", until),
+                    _probe(client, "/api/stats?game_type=memo&limit=10", until),
+                )
+                until = time.monotonic() + BURST_SECONDS
+                health, read, *written = await asyncio.gather(
+                    _probe(client, "/api/health", until),
+                    _probe(client, "/api/stats?game_type=memo&limit=10", until),
+                    *(_write(client, ids[writer::WRITERS], until) for writer in range(WRITERS)),
+                )
+        print(f"записей за {BURST_SECONDS} с: {sum(written)}")
+        latency_report("health idle", idle_health)
+        latency_report("stats idle", idle_read)
+        report = latency_report("health under burst", health)
+        latency_report("stats under burst", read)
+        # Цикл событий не ждёт SQLite: health не стоит в очереди за записями.
+        assert report["p99"] < 100
+
+    asyncio.run(scenario())
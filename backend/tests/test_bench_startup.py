@@ -0,0 +1,77 @@
+"""Замер: запуск приложения на большом каталоге media."""
+import asyncio
+import time
+
+import httpx
+
+import db
+from conftest import GAME_TYPES, bench
+
+pytestmark = bench
+
+TEAMS = 2_000
+PLAYERS = 20_000
+
+
+def _start(main, app) -> dict:
+    """Время до приёма запросов и до 200 от /api/ready, этапы запуска."""
+
+    async def scenario() -> dict:
+        started = time.perf_counter()
+        async with main.lifespan(app):
+            accepting = time.perf_counter() - started
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                while (response := await client.get("/api/ready")).status_code != 200:
+                    await asyncio.sleep(0.01)
+                ready = time.perf_counter() - started
+        return {
+            "accepting_ms": round(accepting * 1000, 1),
+            "ready_ms": round(ready * 1000, 1),
+            **response.json(),
+        }
+
+    return asyncio.run(scenario())
+
+
+def test_startup_time_on_large_media_tree(app, tmp_path, monkeypatch):
+    import main
+    from media_index import MediaIndex
+    from startup import StartupPipeline
+
+    media = tmp_path / "media"
+    for team in range(TEAMS):
+        directory = media / f"Команда {team}"
+        directory.mkdir(parents=True)
+        (directory / f"{main.TEAM_VIDEO_BASENAME}.mp4").write_bytes(b"\0" * 1024)
+    (media / f"{main.TEAM_VIDEO_BASENAME}.mp4").write_bytes(b"\0" * 1024)
+    monkeypatch.setattr(main, "MEDIA_DIR", media)
+
+    ids, _ = db.import_registrations(
+        [(f"Игрок {number}", f"Команда {number % TEAMS}", None) for number in range(PLAYERS)]
+    )
+    for start in range(0, len(ids), 1000):
+        db.create_game_results_batch(
+            [
+                (rid, game_type, (rid + offset) % 50 + 1, None)
+                for rid in ids[start : start + 1000]
+                for offset, game_type in enumerate(GAME_TYPES)
+            ]
+        )
+
+    reports = {}
+    for label in ("media changed", "unchanged restart"):
+        # Как в новом процессе: пустые индекс media, кэш рейтингов и этапы запуска.
+        monkeypatch.setattr(main, "media_index", MediaIndex(media, main.TEAM_VIDEO_BASENAME))
+        monkeypatch.setattr(main, "startup", StartupPipeline())
+        main.leaderboard_cache.clear()
+        reports[label] = report = _start(main, app)
+        print(
+            f"startup ({label}): accepting={report['accepting_ms']}ms "
+            f"ready={report['ready_ms']}ms full_init={report['full_init']} "
+            f"steps={report['steps_ms']}"
+        )
+
+    assert reports["media changed"]["full_init"] is True
+    assert reports["unchanged restart"]["full_init"] is False
+    assert not reports["unchanged restart"]["errors"]
@@ -0,0 +1,71 @@
+"""Замер: скорость загрузки видео и задержка API во время неё (user-014)."""
+import asyncio
+import time
+
+import httpx
+
+from conftest import bench, latency_report
+
+pytestmark = bench
+
+VIDEO_MB = 256
+
+
+async def _probe(client: httpx.AsyncClient, url: str, done: asyncio.Event) -> list[float]:
+    latencies = []
+    while not done.is_set():
+        started = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+def test_upload_throughput_and_api_latency(app, tmp_path):
+    import main
+
+    video = tmp_path / "video.mp4"
+    with video.open("wb") as file:
+        for _ in range(VIDEO_MB):
+            file.write(b"\0" * (1024 * 1024))
+
+    async def scenario() -> None:
+        async with main.lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test", timeout=120
+            ) as client:
+                done = asyncio.Event()
+
+                async def upload() -> float:
+                    started = time.perf_counter()
+                    try:
+                        with video.open("rb") as file:
+                            response = await client.post(
+                                "/api/admin/videos/Замер",
+                                files={"file": ("video.mp4", file, "video/mp4")},
+                                headers={"X-Admin-Password": main.ADMIN_PASSWORD},
+                            )
+                    finally:
+                        done.set()
+                    assert response.status_code == 200
+                    return time.perf_counter() - started
+
+                elapsed, health, stats = await asyncio.gather(
+                    upload(),
+                    _probe(client, "/api/health", done),
+                    _probe(client, "/api/team-stats", done),
+                )
+        print(f"загрузка {VIDEO_MB} МБ: {elapsed:.2f} с, {VIDEO_MB / elapsed:.0f} МБ/с")
+        report = latency_report("health during upload", health)
+        latency_report("team-stats during upload", stats)
+        # Запись файла идёт в потоках, цикл событий остаётся свободным.
+        assert report["p99"] < 100
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for path in (main.MEDIA_DIR / "Замер").glob("*"):
+            path.unlink()
+        (main.MEDIA_DIR / "Замер").rmdir()
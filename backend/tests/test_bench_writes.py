@@ -0,0 +1,53 @@
+"""Замер: задержка отправки результата при одновременных отправителях (user-002)."""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+import db
+from conftest import bench, latency_report
+
+pytestmark = bench
+
+
+@pytest.mark.parametrize("submitters", [50, 200, 1000])
+def test_submit_latency_under_concurrency(database, submitters):
+    ids, _ = db.import_registrations(
+        [(f"Игрок {number}", f"Команда {number % 12}", None) for number in range(submitters)]
+    )
+    barrier = threading.Barrier(submitters)
+
+    def submit(registration_id: int) -> float:
+        barrier.wait()
+        started = time.perf_counter()
+        db.create_game_result(registration_id, registration_id % 50 + 1, "memo")
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=submitters) as executor:
+        latencies = list(executor.map(submit, ids))
+
+    report = latency_report(f"submit x{submitters}", latencies)
+    # Ни одна отправка не упёрлась в очередь писателя (иначе был бы 503).
+    assert report["max"] < db.DB_WRITE_TIMEOUT * 1000
+
+
+def test_submit_latency_on_large_board(database):
+    # Место и число игроков считаются под блокировкой писателя: на большом
+    # рейтинге это видно в задержке каждой отправки.
+    seeded, _ = db.import_registrations(
+        [(f"Игрок {number}", f"Команда {number % 12}", None) for number in range(50_000)]
+    )
+    for start in range(0, len(seeded), 1000):
+        db.create_game_results_batch(
+            [(rid, "memo", rid % 50 + 1, None) for rid in seeded[start : start + 1000]]
+        )
+    ids, _ = db.import_registrations(
+        [(f"Новичок {number}", f"Команда {number % 12}", None) for number in range(500)]
+    )
+    latencies = []
+    for registration_id in ids:
+        started = time.perf_counter()
+        db.create_game_result(registration_id, registration_id % 50 + 1, "memo")
+        latencies.append(time.perf_counter() - started)
+    latency_report("submit on 50k board", latencies)
@@ -0,0 +1,81 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+import pytest
+
+from bulk_io import iter_csv_records, iter_json_array
+import db
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _collect(iterator) -> list:
+    async def collect() -> list:
+        return [item async for item in iterator]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("size", [1, 3, 1024])
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("[]", []),
+        ("  [ ]  ", []),
+        ("[1]", [1]),
+        ('[1, 22.5, "a,]", {"b": [1, 2]}, null]', [1, 22.5, "a,]", {"b": [1, 2]}, None]),
+        ('﻿[{"id": "x"},\n {"id": "y"}]\n', [{"id": "x"}, {"id": "y"}]),
+        ("[12345]", [12345]),
+    ],
+)
+def test_json_array_items(text, expected, size):
+    assert _collect(iter_json_array(_chunks(text.encode(), size))) == expected
+
+
+@pytest.mark.parametrize("size", [1, 1024])
+@pytest.mark.parametrize(
+    "text",
+    ["[1 2]", "[,1]", "[1,,2]", "[1,]", "[,]", "[{} {}]", "[1", "1", "{}", "[1] 2", "[1]]", ""],
+)
+def test_json_array_rejects_malformed(text, size):
+    with pytest.raises(ValueError, match="bad_json"):
+        _collect(iter_json_array(_chunks(text.encode(), size)))
+
+
+@pytest.mark.parametrize("size", [1, 5, 1024])
+def test_csv_records(size):
+    data = (
+        "﻿fio,team,email\n"
+        "Иван,Альфа,ivan@example.com\n"
+        "\n"
+        '"Пётр ""Младший""","Бета,\nвторая строка",\r\n'
+    ).encode()
+    assert _collect(iter_csv_records(_chunks(data, size))) == [
+        {"fio": "Иван", "team": "Альфа", "email": "ivan@example.com"},
+        {"fio": 'Пётр "Младший"', "team": "Бета,\nвторая строка", "email": ""},
+    ]
+
+
+@pytest.mark.parametrize("text", ['fio,team\n"Иван,Альфа\n', 'fio,team\n"Иван"x,Альфа\n'])
+def test_csv_rejects_unbalanced_quotes(text):
+    with pytest.raises(ValueError, match="bad_csv"):
+        _collect(iter_csv_records(_chunks(text.encode(), 1024)))
+
+
+def test_malformed_import_does_not_replace_question_bank(app):
+    import main
+
+    before = db.list_truth_or_myth_questions()
+    body = '[{"statement": "Первое", "is_true": true} {"statement": "Второе", "is_true": false},]'
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/admin/questions/import",
+            params={"mode": "replace"},
+            content=body.encode(),
+            headers={"X-Admin-Password": main.ADMIN_PASSWORD, "Content-Type": "application/json"},
+        )
+    assert response.status_code == 400
+    assert db.list_truth_or_myth_questions() == before
@@ -0,0 +1,14 @@
+import db
+
+
+def test_listeners_run_before_new_versions_are_visible(database, monkeypatch):
+    seen: list[tuple[int, ...]] = []
+    monkeypatch.setattr(
+        db, "_change_listeners", [lambda _: seen.append(db.table_versions("registrations"))]
+    )
+    before = db.table_versions("registrations")
+
+    db.create_registration("Иван", "Альфа")
+
+    assert seen == [before]
+    assert db.table_versions("registrations") > before
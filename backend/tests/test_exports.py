@@ -0,0 +1,16 @@
+import db
+
+
+def test_stalled_exports_do_not_exhaust_pool(database):
+    db.create_registration("Иван", "Альфа")
+    exports = [db.iter_results_export() for _ in range(db.DB_POOL_SIZE)]
+    exports += [db.iter_truth_or_myth_questions() for _ in range(db.DB_POOL_SIZE)]
+    try:
+        for export in exports:
+            next(export, None)
+        # Все выгрузки открыты и не дочитаны, а запись и чтение всё ещё проходят.
+        db.create_registration("Пётр", "Альфа")
+        assert db.get_played_games(1) == []
+    finally:
+        for export in exports:
+            export.close()
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+import threading
+
+import db
+
+THREADS = 16
+
+
+def test_parallel_duplicate_submit_keeps_one_result(database):
+    registration_id = db.create_registration("Иван", "Альфа")
+    barrier = threading.Barrier(THREADS)
+
+    def submit(moves: int) -> str:
+        barrier.wait()
+        try:
+            db.create_game_result(registration_id, moves, "memo")
+        except ValueError as e:
+            return str(e)
+        return "created"
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        outcomes = list(executor.map(submit, range(1, THREADS + 1)))
+
+    assert outcomes.count("created") == 1
+    assert outcomes.count("already_played") == THREADS - 1
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        rows = conn.execute(
+            "SELECT COUNT(*) FROM game_results WHERE registration_id = ? AND game_type = 'memo';",
+            (registration_id,),
+        ).fetchone()[0]
+        games_count = conn.execute(
+            "SELECT games_count FROM player_game_stats WHERE registration_id = ?;",
+            (registration_id,),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert rows == 1
+    assert games_count == 1
+
+
+def test_placement_matches_leaderboards(app, results):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        for moves, game_type in [(1, "memo"), (20, "truth_or_myth"), (41, "reaction")]:
+            registration_id = db.create_registration(f"Новичок {moves}", "Команда 3")
+            placement = db.create_game_result(registration_id, moves, game_type)
+
+            board = client.get("/api/stats", params={"game_type": game_type}).json()["entries"]
+            position = next(
+                i for i, entry in enumerate(board) if entry["registration_id"] == registration_id
+            )
+            assert placement["rank"] == position + 1
+            assert placement["total_players"] == len(board)
+            expected = round(100 * (len(board) - position) / len(board), 1)
+            assert placement["percentile"] == expected
+
+            totals = client.get("/api/team-total-stats").json()["entries"]
+            teams = [entry["team"] for entry in totals]
+            assert placement["team_position"] == teams.index("Команда 3") + 1
+
+
+def test_total_players_follows_batches_and_resets(results):
+    assert db.create_game_result(10_000, 5, "memo") == {"id": 301, "total_players": 100}
+
+    registration_id = db.create_registration("Пакет", "Команда 1")
+    db.create_game_results_batch([(registration_id, "memo", 3, None)])
+    placement = db.create_game_result(db.create_registration("Ещё", "Команда 1"), 3, "memo")
+    assert placement["total_players"] == 102
+
+    db.reset_all_game_results()
+    placement = db.create_game_result(registration_id, 7, "reaction")
+    assert placement["total_players"] == 1
+    assert placement["rank"] == 1
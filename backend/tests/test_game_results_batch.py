@@ -0,0 +1,88 @@
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+import db
+
+
+def _stored(registration_id: int, game_type: str) -> list[int]:
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        return [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM game_results WHERE registration_id = ? AND game_type = ?;",
+                (registration_id, game_type),
+            )
+        ]
+    finally:
+        conn.close()
+
+
+def test_batch_statuses(database):
+    first = db.create_registration("Иван", "Альфа")
+    second = db.create_registration("Пётр", "Альфа")
+    existing = db.create_game_result(first, 10, "reaction")["id"]
+
+    results = db.create_game_results_batch(
+        [
+            (first, "memo", 5, "kiosk-1"),
+            (first, "memo", 4, None),  # та же пара в том же пакете
+            (second, "memo", 7, "kiosk-1"),  # ключ уже занят первым элементом
+            (first, "reaction", 3, "kiosk-2"),  # результат уже был до пакета
+            (second, "truth_or_myth", 2, None),
+        ]
+    )
+
+    created = _stored(first, "memo")[0]
+    other = _stored(second, "truth_or_myth")[0]
+    assert results == [
+        ("created", created),
+        ("already_played", None),
+        ("created", created),
+        ("already_played", None),
+        ("created", other),
+    ]
+    assert _stored(second, "memo") == []
+    assert _stored(first, "reaction") == [existing]
+
+
+def test_batch_replay_returns_original_ids(database):
+    registration_id = db.create_registration("Иван", "Альфа")
+    items = [
+        (registration_id, "memo", 5, "kiosk-1"),
+        (registration_id, "reaction", 8, "kiosk-2"),
+    ]
+    first = db.create_game_results_batch(items)
+    versions = db.table_versions("game_results")
+
+    replay = db.create_game_results_batch(items)
+
+    assert replay == first
+    assert all(status == "created" for status, _ in replay)
+    # Повтор ничего не записал и не сбросил кэши рейтингов.
+    assert db.table_versions("game_results") == versions
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        assert conn.execute("SELECT games_count FROM player_game_stats;").fetchall() == [(1,), (1,)]
+    finally:
+        conn.close()
+
+
+def test_non_object_items_are_invalid_individually(app):
+    registration_id = db.create_registration("Иван", "Альфа")
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/game-results:batch",
+            json={
+                "items": [
+                    5,
+                    None,
+                    "memo",
+                    {"registration_id": registration_id, "game_type": "memo", "moves": 3},
+                ]
+            },
+        )
+    assert response.status_code == 200
+    statuses = [item["status"] for item in response.json()["results"]]
+    assert statuses == ["invalid", "invalid", "invalid", "created"]
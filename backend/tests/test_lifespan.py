@@ -0,0 +1,8 @@
+from fastapi.testclient import TestClient
+
+
+def test_app_restarts_in_same_process(app):
+    for _ in range(2):
+        with TestClient(app) as client:
+            response = client.post("/api/register", json={"fio": "Иван", "team": "Альфа"})
+            assert response.status_code == 200
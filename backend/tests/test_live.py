@@ -0,0 +1,38 @@
+import asyncio
+
+from live import LeaderboardBroadcaster
+
+
+def _snapshot(score: int) -> dict:
+    return {"team_totals": [{"team": "A", "total_score": score}], "top": {}}
+
+
+def test_early_subscriber_gets_snapshot_before_diffs():
+    async def scenario() -> list[str]:
+        builds = iter([RuntimeError("database busy"), _snapshot(1), _snapshot(2)])
+
+        async def build() -> dict:
+            item = next(builds)
+            if isinstance(item, Exception):
+                raise item
+            return item
+
+        broadcaster = LeaderboardBroadcaster(build)
+        stream = broadcaster.stream()
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        runner = asyncio.create_task(broadcaster.run())
+        await asyncio.sleep(0.01)
+        broadcaster.notify()
+        events = [await asyncio.wait_for(first, 1)]
+        broadcaster.notify()
+        events.append(await asyncio.wait_for(anext(stream), 1))
+        runner.cancel()
+        await stream.aclose()
+        return events
+
+    first, second = asyncio.run(scenario())
+    assert first.startswith("id: 1\nevent: snapshot\n")
+    assert '"total_score":1' in first
+    assert "event: diff\n" in second
+    assert '"total_score":2' in second
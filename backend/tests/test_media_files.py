@@ -0,0 +1,36 @@
+import os
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from media_files import IMMUTABLE_CACHE_CONTROL, MediaFileResponse, MediaFiles
+from media_index import MediaIndex
+
+VIDEO = os.urandom(3 * MediaFileResponse.chunk_size + 123)
+
+
+def _client(tmp_path) -> tuple[TestClient, str]:
+    (tmp_path / "Альфа").mkdir()
+    (tmp_path / "Альфа" / "congrats.mp4").write_bytes(VIDEO)
+    index = MediaIndex(tmp_path, "congrats")
+    index.rebuild()
+    app = Starlette(routes=[Mount("/media", MediaFiles(directory=tmp_path, index=index))])
+    return TestClient(app), index.get("Альфа").version
+
+
+def test_full_and_range_requests(tmp_path):
+    client, version = _client(tmp_path)
+
+    full = client.get(f"/media/Альфа/congrats.mp4?v={version}")
+    assert full.status_code == 200
+    assert full.content == VIDEO
+    assert full.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    start = MediaFileResponse.chunk_size - 10
+    ranged = client.get(
+        "/media/Альфа/congrats.mp4", headers={"Range": f"bytes={start}-{start + 99}"}
+    )
+    assert ranged.status_code == 206
+    assert ranged.content == VIDEO[start : start + 100]
+    assert ranged.headers["cache-control"] == "no-cache"
@@ -0,0 +1,25 @@
+import pytest
+
+from metrics import Counter, Histogram, Registry, _Metric
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        _Metric("broken", "Без samples.")
+
+
+def test_render_counter_and_histogram():
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Запросы.", ("route",)))
+    histogram = registry.register(Histogram("duration_seconds", "Время.", buckets=(0.1, 1.0)))
+    counter.inc("/api/stats")
+    counter.inc("/api/stats")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/api/stats"} 2' in lines
+    assert 'duration_seconds_bucket{le="0.1"} 1' in lines
+    assert 'duration_seconds_bucket{le="+Inf"} 2' in lines
+    assert "duration_seconds_count 2" in lines
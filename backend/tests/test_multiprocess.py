@@ -0,0 +1,63 @@
+"""Кэш рейтингов воркера не отстаёт от записей другого процесса дольше периода сверки."""
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from conftest import BACKEND_DIR
+
+POLL_INTERVAL = 0.05
+# Период сверки плюс запас на планирование потоков.
+STALENESS_BOUND = POLL_INTERVAL + 0.25
+WRITES = 10
+
+WRITER = """
+import sys
+import time
+
+import db
+
+db.DB_PATH = sys.argv[1]
+for line in sys.stdin:
+    registration_id = db.create_registration("Из другого воркера", "Альфа")
+    db.create_game_result(registration_id, 1, "memo")
+    print(registration_id, time.monotonic(), flush=True)
+"""
+
+
+def _visible(client: TestClient, registration_id: int) -> bool:
+    entries = client.get("/api/stats", params={"game_type": "memo"}).json()["entries"]
+    return any(entry["registration_id"] == registration_id for entry in entries)
+
+
+def test_other_process_writes_reach_cache_within_poll_interval(app, monkeypatch):
+    import db
+    import main
+
+    monkeypatch.setattr(main, "CHANGE_POLL_INTERVAL", POLL_INTERVAL)
+    writer = subprocess.Popen(
+        [sys.executable, "-c", WRITER, str(db.DB_PATH)],
+        cwd=BACKEND_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    staleness = []
+    try:
+        with TestClient(app) as client:
+            for _ in range(WRITES):
+                # Ответ в кэше — без сверки он так и отдавался бы до конца TTL.
+                client.get("/api/stats", params={"game_type": "memo"})
+                writer.stdin.write("write\n")
+                writer.stdin.flush()
+                registration_id, committed_at = writer.stdout.readline().split()
+                while not _visible(client, int(registration_id)):
+                    assert time.monotonic() - float(committed_at) < 5
+                    time.sleep(0.005)
+                staleness.append(time.monotonic() - float(committed_at))
+    finally:
+        writer.stdin.close()
+        writer.wait(timeout=10)
+
+    assert max(staleness) < STALENESS_BOUND, staleness
@@ -0,0 +1,119 @@
+"""Запросы рейтингов читают агрегаты по индексам, без полного прохода по таблице."""
+import sqlite3
+
+import pytest
+
+import db
+from conftest import GAME_TYPES
+
+IGNORED_PREFIXES = ("PRAGMA", "BEGIN", "SELECT 1;")
+CTE_NAMES = ("board", "ranked", "tied")
+
+
+@pytest.fixture
+def statements(results, monkeypatch):
+    """Текст запросов (с подставленными параметрами), выполненных через пул."""
+    executed: list[str] = []
+    get_connection = db.get_connection
+
+    def traced_connection() -> sqlite3.Connection:
+        conn = get_connection()
+        conn.set_trace_callback(executed.append)
+        return conn
+
+    db.close_pool()
+    monkeypatch.setattr(db, "get_connection", traced_connection)
+    return executed
+
+
+def _plans(executed: list[str]) -> list[list[str]]:
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        return [
+            [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            for sql in executed
+            if not sql.lstrip().upper().startswith(IGNORED_PREFIXES)
+        ]
+    finally:
+        conn.close()
+
+
+def _scans(plan: list[str], expected: tuple[str, ...] = ()) -> list[str]:
+    # Любой полный проход по таблице, в том числе по всему индексу
+    # ("SCAN t USING INDEX ..."); "SCAN board" — проход по строкам подзапроса,
+    # сам подзапрос виден отдельными шагами.
+    return [
+        step
+        for step in plan
+        if step.startswith("SCAN ") and step.split()[1] not in (*CTE_NAMES, *expected)
+    ]
+
+
+def _table_scans(plan: list[str], expected: tuple[str, ...] = ()) -> list[str]:
+    # Проход по таблице мимо индексов: строки ещё и сортируются отдельно.
+    return [step for step in _scans(plan, expected) if "INDEX" not in step]
+
+
+@pytest.mark.parametrize(
+    ("call", "index"),
+    [
+        (lambda: db.get_stats("memo"), "ix_player_game_stats_rank"),
+        (lambda: db.get_stats("reaction", 10), "ix_player_game_stats_rank"),
+        (lambda: db.get_team_stats("truth_or_myth"), "ix_team_game_stats_rank"),
+        (lambda: db.get_player_rank_window(1, "memo", 5), "ix_player_game_stats_rank"),
+        pytest.param(
+            lambda: db.get_player_rank_window(1, None, 5),
+            None,
+            marks=pytest.mark.xfail(
+                strict=True,
+                reason="известное O(N): общий рейтинг агрегируется по участнику при каждом вызове",
+            ),
+        ),
+    ],
+    ids=["stats-game", "stats-game-limit", "team-stats-game", "rank-window", "rank-window-all"],
+)
+def test_leaderboard_queries_read_index_ranges(statements, call, index):
+    call()
+    plans = _plans(statements)
+    assert plans
+    for plan in plans:
+        assert not _scans(plan), plan
+    if index is not None:
+        assert any(index in step for plan in plans for step in plan), plans
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda: db.get_stats(None),
+        lambda: db.get_team_stats(None),
+        db.get_team_total_standings,
+        lambda: db.get_victory_boards(GAME_TYPES),
+    ],
+    ids=["stats-all", "team-stats-all", "team-total-standings", "victory-boards"],
+)
+def test_whole_boards_walk_indexes(statements, call):
+    # Возвращаются все строки, поэтому полный проход допустим, но только по индексу.
+    call()
+    plans = _plans(statements)
+    assert plans
+    for plan in plans:
+        assert not _table_scans(plan), plan
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda: db.has_played_game(1, "memo"),
+        lambda: db.get_played_games(1),
+        lambda: list(db.iter_results_export(game_type="memo")),
+    ],
+    ids=["has-played", "played-games", "export-by-game"],
+)
+def test_result_lookups_use_unique_index(statements, call):
+    call()
+    plans = _plans(statements)
+    for plan in plans:
+        # Выгрузка по определению проходит все регистрации (r), но не результаты.
+        assert not _scans(plan, expected=("r",)), plan
+    assert any("ix_game_results_reg_game" in step for plan in plans for step in plan), plans
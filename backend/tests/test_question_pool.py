@@ -0,0 +1,34 @@
+import pytest
+
+from question_pool import QuestionPool
+
+QUESTIONS = [
+    {"id": str(number), "statement": f"Утверждение {number}", "is_true": 1} for number in range(10)
+]
+
+
+def test_failed_load_leaves_pool_stale():
+    loads = iter([RuntimeError("database busy"), QUESTIONS])
+
+    def load() -> list:
+        result = next(loads)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    pool = QuestionPool(load)
+    with pytest.raises(RuntimeError):
+        pool.refresh()
+    assert pool.stale
+
+    pool.refresh()
+    assert not pool.stale
+    assert len(pool.sample(3)) == 3
+
+
+def test_registration_sees_new_questions_first():
+    pool = QuestionPool(lambda: QUESTIONS)
+    pool.refresh()
+    first = {question["id"] for question in pool.sample(5, registration_id=1)}
+    second = {question["id"] for question in pool.sample(5, registration_id=1)}
+    assert not first & second
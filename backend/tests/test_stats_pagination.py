@@ -0,0 +1,71 @@
+"""Курсоры и окна рейтинга не теряют и не повторяют строк."""
+import pytest
+from fastapi.testclient import TestClient
+
+import db
+from conftest import GAME_TYPES
+
+PLAYERS = 300
+
+
+@pytest.fixture
+def client(app):
+    # Повторяющиеся ФИО (в том числе с другим регистром) и много равных результатов.
+    names = [
+        (f"{'игрок' if number % 3 else 'Игрок'} {number % 40}", f"Команда {number % 7}", None)
+        for number in range(PLAYERS)
+    ]
+    ids, _ = db.import_registrations(names)
+    db.create_game_results_batch(
+        [
+            (registration_id, game_type, (registration_id * 7 + offset) % 9 + 1, None)
+            for registration_id in ids
+            for offset, game_type in enumerate(GAME_TYPES)
+            if (registration_id + offset) % 4
+        ]
+    )
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _board(client: TestClient, params: dict) -> list[dict]:
+    return client.get("/api/stats", params=params).json()["entries"]
+
+
+@pytest.mark.parametrize("game_type", [*GAME_TYPES, None])
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_pages_cover_board_exactly_once(client, game_type, limit):
+    params = {"game_type": game_type} if game_type else {}
+    full = _board(client, params)
+    pages: list[dict] = []
+    cursor = None
+    while True:
+        page = client.get(
+            "/api/stats", params={**params, "limit": limit, **({"after": cursor} if cursor else {})}
+        ).json()
+        assert len(page["entries"]) <= limit
+        pages += page["entries"]
+        # Повтор строк зациклил бы обход — останавливаемся на первом лишнем.
+        assert len(pages) <= len(full)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == full
+
+
+@pytest.mark.parametrize("game_type", [*GAME_TYPES, None])
+def test_rank_windows_match_board(client, game_type):
+    params = {"game_type": game_type} if game_type else {}
+    full = _board(client, params)
+    around = 3
+    for position, entry in enumerate(full):
+        window = client.get(
+            "/api/stats", params={**params, "rank_of": entry["registration_id"], "around": around}
+        ).json()
+        assert window["rank"] == position + 1
+        start = max(position - around, 0)
+        expected = [
+            {**row, "rank": start + offset + 1}
+            for offset, row in enumerate(full[start : position + around + 1])
+        ]
+        assert window["entries"] == expected
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from uploads import UploadSessions
+
+MAX_BYTES = 1000
+
+
+async def _body(data: bytes):
+    yield data
+
+
+def test_parts_count_against_session_limit(tmp_path):
+    sessions = UploadSessions(tmp_path, MAX_BYTES)
+    session = sessions.create("Альфа", ".mp4")
+
+    async def scenario() -> None:
+        await sessions.write_part(session.upload_id, 0, 0, _body(b"x" * 600))
+        # Другой номер с тем же смещением не обходит лимит сессии.
+        with pytest.raises(ValueError, match="too_large"):
+            await sessions.write_part(session.upload_id, 1, 0, _body(b"x" * 600))
+        # Повтор куска с тем же номером заменяет прежний и укладывается в лимит.
+        await sessions.write_part(session.upload_id, 0, 0, _body(b"y" * 900))
+        await sessions.write_part(session.upload_id, 1, 900, _body(b"z" * 100))
+
+    asyncio.run(scenario())
+    assert sessions.status(session.upload_id).received_bytes == MAX_BYTES
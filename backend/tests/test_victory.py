@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+import db
+from conftest import GAME_TYPES
+
+
+def test_victory_matches_leaderboards_and_reuses_cached_boards(app, results):
+    import main
+
+    with TestClient(app) as client:
+        victory = client.get("/api/victory", params={"game_type": "memo", "registration_id": 7})
+        assert victory.status_code == 200
+        data = victory.json()
+        for board in data["boards"]:
+            stats = client.get("/api/stats", params={"game_type": board["game_type"]}).json()
+            assert board["players"] == stats["entries"]
+        assert [board["game_type"] for board in data["boards"]] == list(GAME_TYPES)
+        assert data["team_totals"] == client.get("/api/team-total-stats").json()["entries"]
+
+        memo = data["boards"][0]["players"]
+        position = next(i for i, entry in enumerate(memo) if entry["registration_id"] == 7)
+        assert data["rank"] == position + 1
+        assert data["player"] == {**memo[position], "rank": position + 1}
+
+        misses = main.leaderboard_cache.misses
+        other = client.get("/api/victory", params={"game_type": "reaction", "registration_id": 8})
+        assert other.status_code == 200
+        assert main.leaderboard_cache.misses == misses
+
+        db.create_game_result(db.create_registration("Новичок", "Команда 0"), 1, "memo")
+        fresh = client.get("/api/victory", params={"game_type": "memo", "registration_id": 7})
+        assert fresh.json()["rank"] == data["rank"] + 1
+
+        unknown = client.get("/api/victory", params={"registration_id": 10_000})
+        assert unknown.status_code == 200
+        assert unknown.json()["rank"] is None
+        assert unknown.json()["player"] is None
+        assert unknown.json()["team_video_url"] is None
+        assert unknown.json()["boards"] == fresh.json()["boards"]
+
+        idle = db.create_registration("Зритель", "Команда 0")
+        waiting = client.get("/api/victory", params={"registration_id": idle}).json()
+        assert waiting["rank"] is None and waiting["player"] is None
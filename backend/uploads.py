@@ -0,0 +1,251 @@
+"""Потоковое сохранение загружаемых файлов и докачиваемые загрузки."""
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+import time
+from typing import BinaryIO
+from uuid import uuid4
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Незавершённые сессии докачки старше суток удаляются.
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+_PART_NAME = re.compile(r"(\d{6})-(\d+)\.chunk")
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    path: Path
+    size: int
+    sha256: str | None
+
+
+@dataclass(frozen=True)
+class UploadPart:
+    number: int
+    offset: int
+    size: int
+
+
+@dataclass(frozen=True)
+class UploadSession:
+    upload_id: str
+    team_key: str
+    extension: str
+    parts: list[UploadPart]
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(part.size for part in self.parts)
+
+
+def _open_temp(directory: Path, name: str) -> tuple[Path, BinaryIO]:
+    directory.mkdir(parents=True, exist_ok=True)
+    # Точка в начале: индекс media такие файлы не видит.
+    temp_path = directory / f".{name}.{uuid4().hex}.part"
+    return temp_path, temp_path.open("xb")
+
+
+def _commit(handle: BinaryIO, temp_path: Path, target: Path, replaces: str | None) -> None:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    os.replace(temp_path, target)
+    if replaces is None:
+        return
+    # Старые файлы с другим расширением убираем только после подмены.
+    for existing in target.parent.glob(f"{replaces}.*"):
+        if existing.name != target.name and existing.is_file():
+            existing.unlink(missing_ok=True)
+
+
+def _write(handle: BinaryIO, hasher, chunk: bytes) -> None:
+    if hasher is not None:
+        hasher.update(chunk)
+    handle.write(chunk)
+
+
+def _discard(handle: BinaryIO, temp_path: Path) -> None:
+    handle.close()
+    temp_path.unlink(missing_ok=True)
+
+
+async def save_stream(
+    chunks: AsyncIterator[bytes],
+    target: Path,
+    *,
+    max_bytes: int,
+    replaces: str | None = None,
+    compute_hash: bool = True,
+) -> StoredFile:
+    """Пишет поток во временный файл рядом с `target` и атомарно подменяет его.
+
+    Хэширование, запись и fsync идут в потоке, так что цикл событий не
+    блокируется. Если данных больше `max_bytes`, бросает
+    ValueError("too_large"), а прежний файл остаётся на месте. `replaces` —
+    базовое имя, чьи файлы с другими расширениями удаляются после подмены.
+    """
+    temp_path, handle = await asyncio.to_thread(_open_temp, target.parent, target.name)
+    hasher = hashlib.sha256() if compute_hash else None
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError("too_large")
+            await asyncio.to_thread(_write, handle, hasher, chunk)
+        await asyncio.to_thread(_commit, handle, temp_path, target, replaces)
+    except BaseException:
+        await asyncio.to_thread(_discard, handle, temp_path)
+        raise
+    return StoredFile(target, size, hasher.hexdigest() if hasher else None)
+
+
+async def _read_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def save_upload(
+    file: UploadFile,
+    target: Path,
+    *,
+    max_bytes: int,
+    replaces: str | None = None,
+    compute_hash: bool = True,
+) -> StoredFile:
+    """То же, что `save_stream`, для файла из multipart-формы; закрывает `file`."""
+    try:
+        return await save_stream(
+            _read_upload(file),
+            target,
+            max_bytes=max_bytes,
+            replaces=replaces,
+            compute_hash=compute_hash,
+        )
+    finally:
+        await file.close()
+
+
+class UploadSessions:
+    """Докачиваемые загрузки: сессия, куски с номером и смещением, сборка.
+
+    Сессия — каталог `<root>/<upload_id>` с meta.json и кусками
+    `<номер>-<смещение>.chunk`. Повторная отправка куска с тем же номером
+    заменяет прежний. Ошибки — ValueError("not_found" / "too_large" /
+    "bad_offset" / "incomplete").
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self._root = root
+        self._max_bytes = max_bytes
+
+    def _session_dir(self, upload_id: str) -> Path:
+        if not _SESSION_ID.fullmatch(upload_id):
+            raise ValueError("not_found")
+        directory = self._root / upload_id
+        if not (directory / "meta.json").is_file():
+            raise ValueError("not_found")
+        return directory
+
+    def _load(self, directory: Path) -> UploadSession:
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        parts = []
+        for item in directory.iterdir():
+            match = _PART_NAME.fullmatch(item.name)
+            if match:
+                parts.append(UploadPart(int(match[1]), int(match[2]), item.stat().st_size))
+        parts.sort(key=lambda part: part.number)
+        return UploadSession(directory.name, meta["team_key"], meta["extension"], parts)
+
+    def _expire(self) -> None:
+        if not self._root.is_dir():
+            return
+        deadline = time.time() - UPLOAD_SESSION_TTL
+        for directory in self._root.iterdir():
+            if directory.is_dir() and directory.stat().st_mtime < deadline:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def create(self, team_key: str, extension: str) -> UploadSession:
+        self._expire()
+        upload_id = uuid4().hex
+        directory = self._root / upload_id
+        directory.mkdir(parents=True)
+        meta = {"team_key": team_key, "extension": extension, "created_at": time.time()}
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        return UploadSession(upload_id, team_key, extension, [])
+
+    def status(self, upload_id: str) -> UploadSession:
+        return self._load(self._session_dir(upload_id))
+
+    def _drop_other_offsets(self, directory: Path, number: int, keep: str) -> None:
+        for item in directory.glob(f"{number:06d}-*.chunk"):
+            if item.name != keep:
+                item.unlink(missing_ok=True)
+
+    async def write_part(
+        self, upload_id: str, number: int, offset: int, chunks: AsyncIterator[bytes]
+    ) -> UploadPart:
+        directory = await asyncio.to_thread(self._session_dir, upload_id)
+        if not 0 <= number < 1_000_000 or not 0 <= offset < self._max_bytes:
+            raise ValueError("bad_offset")
+        session = await asyncio.to_thread(self._load, directory)
+        # Лимит — на всю сессию: кусок с тем же номером будет заменён и не в счёт.
+        received = sum(part.size for part in session.parts if part.number != number)
+        budget = min(self._max_bytes - offset, self._max_bytes - received)
+        if budget <= 0:
+            raise ValueError("too_large")
+        name = f"{number:06d}-{offset}.chunk"
+        stored = await save_stream(
+            chunks,
+            directory / name,
+            max_bytes=budget,
+            compute_hash=False,
+        )
+        await asyncio.to_thread(self._drop_other_offsets, directory, number, name)
+        return UploadPart(number, offset, stored.size)
+
+    def _assemble(self, upload_id: str, target: Path, replaces: str) -> StoredFile:
+        directory = self._session_dir(upload_id)
+        session = self._load(directory)
+        expected = 0
+        for part in session.parts:
+            if part.offset != expected:
+                raise ValueError("incomplete" if part.offset > expected else "bad_offset")
+            expected += part.size
+        if expected == 0:
+            raise ValueError("incomplete")
+        if expected > self._max_bytes:
+            raise ValueError("too_large")
+
+        temp_path, handle = _open_temp(target.parent, target.name)
+        try:
+            for part in session.parts:
+                with (directory / f"{part.number:06d}-{part.offset}.chunk").open("rb") as source:
+                    shutil.copyfileobj(source, handle, UPLOAD_CHUNK_SIZE)
+            _commit(handle, temp_path, target, replaces)
+        except BaseException:
+            _discard(handle, temp_path)
+            raise
+        shutil.rmtree(directory, ignore_errors=True)
+        return StoredFile(target, expected, None)
+
+    async def assemble(self, upload_id: str, target: Path, replaces: str) -> StoredFile:
+        """Склеивает куски по порядку номеров в `target` и удаляет сессию.
+
+        Куски должны идти встык с нулевого смещения. Копирование идёт
+        потоково в отдельном потоке, целиком в память файл не читается.
+        """
+        return await asyncio.to_thread(self._assemble, upload_id, target, replaces)
+
+    def discard(self, upload_id: str) -> None:
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
@@ -84,6 +84,25 @@ export async function fetchTeamTotalStats() {
   return response.json()
 }
 
+/** Всё для экрана победы одним запросом; ссылки на видео — уже полные URL. */
+export async function fetchVictory(registrationId, gameType = 'memo') {
+  const params = new URLSearchParams({ game_type: gameType })
+  if (registrationId) params.set('registration_id', registrationId)
+  const response = await fetch(`${API_BASE}/api/victory?${params}`)
+  if (!response.ok) {
+    const message = await response.text()
+    throw new Error(message || 'Ошибка загрузки статистики')
+  }
+  const data = await response.json()
+  return {
+    ...data,
+    congrats_url: data.congrats_url
+      ? `${API_BASE}${data.congrats_url}`
+      : getVideoUrl(DEFAULT_VIDEO_PATH),
+    team_video_url: data.team_video_url ? `${API_BASE}${data.team_video_url}` : null,
+  }
+}
+
 export async function fetchTeams() {
   const response = await fetch(`${API_BASE}/api/teams`)
   if (!response.ok) {
@@ -95,6 +114,10 @@ export async function fetchTeams() {
 
 export async function fetchTruthOrMythQuestions(limit = 6) {
   const params = new URLSearchParams({ limit: String(limit) })
+  const registrationId = getRegistrationId()
+  if (registrationId) {
+    params.set('registration_id', String(registrationId))
+  }
   const response = await fetch(
     `${API_BASE}/api/truth-or-myth?${params.toString()}`,
   )
@@ -335,6 +358,7 @@ export function getVideoUrl(videoPath = '') {
 export async function fetchGeneralCongratsUrl() {
   const response = await fetch(`${API_BASE}/api/general-congrats`)
   if (!response.ok) return getVideoUrl(DEFAULT_VIDEO_PATH)
-  const { path } = await response.json()
-  return getVideoUrl(path || DEFAULT_VIDEO_PATH)
+  const { path, version } = await response.json()
+  const url = getVideoUrl(path || DEFAULT_VIDEO_PATH)
+  return version ? `${url}?v=${encodeURIComponent(version)}` : url
 }
@@ -1,10 +1,7 @@
 import { useCallback, useEffect, useRef, useState } from 'react'
 import Fireworks from '../components/Fireworks.jsx'
 import {
-  fetchGeneralCongratsUrl,
-  fetchStats,
-  fetchTeamStats,
-  fetchTeamTotalStats,
+  fetchVictory,
   getLastGame,
   getRegistrationId,
   getSelectedTeam,
@@ -156,10 +153,6 @@ export default function Victory() {
   const [showCongratsFullscreen, setShowCongratsFullscreen] = useState(false)
   const congratsOverlayRef = useRef(null)
 
-  useEffect(() => {
-    fetchGeneralCongratsUrl().then(setGeneralCongratsUrl)
-  }, [])
-
   useEffect(() => {
     if (!showCongratsFullscreen || !congratsOverlayRef.current) return
     const el = congratsOverlayRef.current
@@ -194,28 +187,24 @@ export default function Victory() {
           markGameSubmitted(token)
         }
 
-        const [teamTotalResponse, ...results] = await Promise.all([
-          fetchTeamTotalStats(),
-          ...RATING_CONFIG.map(async (config) => {
-            const [playersResponse, teamsResponse] = await Promise.all([
-              fetchStats(config.gameType),
-              fetchTeamStats(config.gameType),
-            ])
-            return {
-              gameType: config.gameType,
-              players: playersResponse.entries || [],
-              teams: teamsResponse.entries || [],
-            }
-          }),
-        ])
+        const victory = await fetchVictory(registrationId, 'memo')
+        const boards = new Map(victory.boards.map((board) => [board.game_type, board]))
 
         if (isMounted) {
-          setTeamTotalEntries(teamTotalResponse.entries || [])
-          setRatingData(results)
+          setTeamTotalEntries(victory.team_totals || [])
+          setRatingData(
+            RATING_CONFIG.map((config) => ({
+              gameType: config.gameType,
+              players: boards.get(config.gameType)?.players || [],
+              teams: boards.get(config.gameType)?.teams || [],
+            }))
+          )
+          setGeneralCongratsUrl(victory.congrats_url)
         }
       } catch (err) {
         if (isMounted) {
           setError(err.message || 'Ошибка загрузки статистики')
+          setGeneralCongratsUrl(getVideoUrl())
         }
       } finally {
         if (isMounted) {